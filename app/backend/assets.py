@@ -0,0 +1,105 @@
+import hashlib
+import json
+import mimetypes
+import os
+import stat
+import sys
+from typing import Optional
+
+import anyio
+from jinja2 import pass_context
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from app.backend.compression import COMPRESSIBLE_TYPES, brotli, choose_encoding, compress_file
+from app.config import settings
+
+STATIC_DIR = 'app/static'
+BUILD_DIR = 'dist'
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+MANIFEST = os.path.join(STATIC_DIR, BUILD_DIR, 'manifest.json')
+
+_manifest: tuple[Optional[int], dict[str, str]] = (None, {})
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        headers, available = Headers(scope=scope), tuple(EXTENSIONS)
+        # Falls through to the next accepted encoding when a variant was not built (no .br without brotli).
+        while scope['method'] in ('GET', 'HEAD') and (encoding := choose_encoding(headers, available)) is not None:
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + EXTENSIONS[encoding])
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                response = self.file_response(full_path, stat_result, scope)
+                if response.status_code == 200:
+                    response.headers['Content-Encoding'] = encoding
+                    response.headers['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+                return self._cache_headers(path, response)
+            available = available[available.index(encoding) + 1:]
+        return self._cache_headers(path, await super().get_response(path, scope))
+
+    def _cache_headers(self, path: str, response: Response) -> Response:
+        if path.startswith(BUILD_DIR + '/'):
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response.headers['Cache-Control'] = f'public, max-age={settings.STATIC_MAX_AGE}'
+        response.headers.add_vary_header('Accept-Encoding')
+        return response
+
+
+def manifest() -> dict[str, str]:
+    # Reloaded when the file changes, so rebuilt assets are picked up without a restart.
+    global _manifest
+    try:
+        modified = os.stat(MANIFEST).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if modified != _manifest[0]:
+        with open(MANIFEST) as file:
+            _manifest = (modified, json.load(file))
+    return _manifest[1]
+
+
+@pass_context
+def asset_url(context, path: str) -> str:
+    return str(context['request'].url_for('static', path=manifest().get(path, path)))
+
+
+def build_assets(source: str = STATIC_DIR) -> dict[str, str]:
+    output = os.path.join(source, BUILD_DIR)
+    built = {}
+    for root, dirs, files in os.walk(source):
+        if os.path.abspath(root).startswith(os.path.abspath(output)):
+            continue
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), source).replace(os.sep, '/')
+            with open(os.path.join(source, path), 'rb') as file:
+                data = file.read()
+            stem, extension = os.path.splitext(path)
+            hashed = f'{BUILD_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+            target = os.path.join(source, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as file:
+                file.write(data)
+
+            if (mimetypes.guess_type(path)[0] or '').startswith(COMPRESSIBLE_TYPES):
+                for encoding in ('gzip', 'br') if brotli is not None else ('gzip',):
+                    compressed = compress_file(data, encoding)
+                    if len(compressed) < len(data):
+                        with open(target + EXTENSIONS[encoding], 'wb') as file:
+                            file.write(compressed)
+            built[path] = hashed
+
+    # Replaced in one step so a running server never reads a half-written manifest.
+    manifest_path = os.path.join(output, 'manifest.json')
+    with open(manifest_path + '.tmp', 'w') as file:
+        json.dump(built, file, indent=2, ensure_ascii=False)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return built
+
+
+if __name__ == '__main__':
+    for original, hashed in build_assets(*sys.argv[1:]).items():
+        print(f'{original} -> {hashed}')
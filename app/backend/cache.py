@@ -0,0 +1,206 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+from app.backend.metrics import Counter, Gauge, collector
+from app.config import settings
+
+MISSING = object()
+
+caches: list['TTLCache'] = []
+invalidation_listeners: list[tuple[frozenset, Callable[[], Any]]] = []
+# Row tags gathered by the load in progress, so an entry built from other cached reads carries their tags too.
+# A set rather than a fresh value per call so that tags added in child tasks reach the loader.
+_collecting: ContextVar[Optional[set]] = ContextVar('cache_tags', default=None)
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, maxsize: int, tables: tuple[str, ...] = ()):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.tables = frozenset(tables)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any, frozenset]] = OrderedDict()
+        self._keys_by_tag: dict[Hashable, set[Hashable]] = {}
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        self._cleared_at = float('-inf')
+        caches.append(self)
+
+    def _lookup(self, key: Hashable) -> Optional[tuple[float, Any, frozenset]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for row in entry[2]:
+            keys = self._keys_by_tag.get(row)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[row]
+
+    def get(self, key: Hashable):
+        entry = self._lookup(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        tag(entry[2])
+        return entry[1]
+
+    def set(self, key: Hashable, value, ttl: Optional[float] = None, tags: Iterable[Hashable] = ()):
+        self._remove(key)
+        tags = frozenset(tags)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value, tags)
+        for row in tags:
+            self._keys_by_tag.setdefault(row, set()).add(key)
+        while len(self._data) > self.maxsize:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def delete(self, key: Hashable):
+        self._remove(key)
+
+    def clear(self):
+        self._generation += 1
+        self._cleared_at = time.monotonic()
+        self._data.clear()
+        self._keys_by_tag.clear()
+
+    def invalidate_tags(self, tags: Iterable[Hashable]):
+        self._generation += 1
+        self._cleared_at = time.monotonic()
+        for row in tags:
+            for key in self._keys_by_tag.pop(row, ()):
+                self._remove(key)
+
+    def cleared_within(self, seconds: float) -> bool:
+        return time.monotonic() - self._cleared_at < seconds
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable]):
+        if not settings.CACHE_ENABLED:
+            return await loader()
+        while True:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                tag(entry[2])
+                return entry[1]
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                value, tags = await asyncio.shield(pending)
+                tag(tags)
+                return value
+            except _LeaderCancelled:
+                # The loading request went away; the first waiter to get here loads in its place.
+                continue
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        generation = self._generation
+        tags = set()
+        token = _collecting.set(tags)
+        try:
+            value = await loader()
+        except BaseException as exc:
+            future.set_exception(_LeaderCancelled() if isinstance(exc, asyncio.CancelledError) else exc)
+            future.exception()
+            raise
+        finally:
+            _collecting.reset(token)
+            self._pending.pop(key, None)
+
+        tags = frozenset(tags)
+        if generation == self._generation:
+            self.set(key, value, tags=tags)
+        tag(tags)
+        future.set_result((value, tags))
+        return value
+
+    def stats(self) -> dict:
+        return {'name': self.name,
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced}
+
+
+def tag(rows: Iterable[Hashable]):
+    """Mark the entry being loaded (and any entry loading it) as built from these rows."""
+    collecting = _collecting.get()
+    if collecting is not None:
+        collecting.update(rows)
+
+
+def on_invalidate(tables: tuple[str, ...], callback: Callable[[], Any]):
+    invalidation_listeners.append((frozenset(tables), callback))
+
+
+def invalidate_tables(*tables: str):
+    changed = frozenset(tables)
+    for cache in caches:
+        if cache.tables & changed:
+            cache.clear()
+    for watched, callback in invalidation_listeners:
+        if watched & changed:
+            callback()
+
+
+def invalidate_rows(table: str, ids: Iterable[int]):
+    rows = [(table, row_id) for row_id in ids]
+    for cache in caches:
+        if table in cache.tables:
+            cache.invalidate_tags(rows)
+
+
+def watched_tables() -> frozenset:
+    tables = set()
+    for cache in caches:
+        tables |= cache.tables
+    for watched, _ in invalidation_listeners:
+        tables |= watched
+    return frozenset(tables)
+
+
+def cache_stats() -> list[dict]:
+    return [cache.stats() for cache in caches]
+
+
+cache_size = Gauge('cache_entries', 'Entries held by each in-process cache.', ('cache',))
+cache_events = Counter('cache_events_total', 'Cache lookups and evictions.', ('cache', 'event'))
+
+
+@collector
+def _collect_caches():
+    for stats in cache_stats():
+        cache_size.set(stats['name'], value=stats['size'])
+        for event in ('hits', 'misses', 'evictions', 'coalesced'):
+            cache_events.set(stats['name'], event, value=stats[event])
@@ -0,0 +1,134 @@
+import gzip
+import zlib
+from typing import Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Pinned in requirements.txt; without it only gzip is negotiated and no .br assets are built.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+
+
+def accepted_encodings(headers: Headers) -> set[str]:
+    accepted = set()
+    for item in headers.get('accept-encoding', '').split(','):
+        name, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(headers: Headers, available: Sequence[str]) -> Optional[str]:
+    accepted = accepted_encodings(headers)
+    for encoding in available:
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+class Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Streamed chunks are flushed so NDJSON lines reach the client as they are produced.
+        if self.encoding == 'br':
+            return self._compressor.process(data) + (self._compressor.finish() if final else self._compressor.flush())
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5,
+                 exclude_paths: Sequence[str] = ()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.exclude_paths = tuple(exclude_paths)
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope['path'].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await CompressedResponder(self, encoding, send).run(scope, receive)
+
+
+class CompressedResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.wrapped_send)
+
+    def _should_compress(self, headers: MutableHeaders) -> bool:
+        if self.start['status'] in (204, 304) or 'content-encoding' in headers:
+            return False
+        return headers.get('content-type', '').startswith(COMPRESSIBLE_TYPES)
+
+    async def wrapped_send(self, message: Message):
+        if message['type'] == 'http.response.start':
+            self.start = message
+            return
+        if message['type'] != 'http.response.body' or self.passthrough:
+            await self.send(message)
+            return
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start['headers'])
+            body, more_body = message.get('body', b''), message.get('more_body', False)
+            compressible = self._should_compress(headers)
+            if compressible:
+                headers.add_vary_header('Accept-Encoding')
+            if not compressible or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+
+            self.compressor = Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers['Content-Encoding'] = self.encoding
+            etag = headers.get('etag')
+            if etag is not None and not etag.startswith('W/'):
+                # The bytes on the wire differ from the identity representation.
+                headers['ETag'] = f'W/{etag}'
+            if more_body:
+                del headers['Content-Length']
+                await self.send(self.start)
+            else:
+                compressed = self.compressor.compress(body, final=True)
+                headers['Content-Length'] = str(len(compressed))
+                await self.send(self.start)
+                await self.send({'type': 'http.response.body', 'body': compressed})
+                return
+
+        more_body = message.get('more_body', False)
+        await self.send({'type': 'http.response.body',
+                         'body': self.compressor.compress(message.get('body', b''), final=not more_body),
+                         'more_body': more_body})
+
+
+def compress_file(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
@@ -0,0 +1,44 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request
+
+from app.config import settings
+
+
+def make_etag(*parts) -> str:
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+
+def page_last_modified(page: dict) -> Optional[datetime]:
+    # Pages select BaseDAO.last_modified() with their rows: the table's newest change, not just the page's.
+    return page['items'][0].last_modified if page['items'] else None
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {'ETag': etag,
+               'Cache-Control': f'public, max-age={settings.CATALOG_MAX_AGE}, '
+                                f'stale-while-revalidate={settings.CATALOG_STALE_WHILE_REVALIDATE}'}
+    if last_modified is not None:
+        headers['Last-Modified'] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
@@ -1,44 +1,231 @@
-from sqlalchemy import insert, select, update
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import event, func, insert, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.backend.cache import TTLCache, invalidate_rows, invalidate_tables, tag
 from app.backend.db import async_session_maker
+from app.backend.invalidation import broadcast, broadcast_rows
+from app.backend.metrics import observe_pool_wait, tag_dao_method
+from app.backend.pagination import keyset, make_page
+from app.backend.replicas import REPLICA_ERRORS, note_write, read_replica, replicas
+from app.config import settings
 from app.models import Category
-from typing import Optional
+from typing import Optional, Sequence
+
+
+@asynccontextmanager
+async def session_scope(session: Optional[AsyncSession] = None, commit: bool = False):
+    if session is not None:
+        yield session
+        return
+    async with async_session_maker() as session:
+        await checkout(session)
+        yield session
+        if commit:
+            await session.commit()
+
+
+async def checkout(session: AsyncSession):
+    started = time.perf_counter()
+    await session.connection()
+    observe_pool_wait(time.perf_counter() - started)
+
+
+def on_commit(session: AsyncSession, callback):
+    session.info.setdefault('on_commit', []).append(callback)
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_commit_callbacks(session: Session):
+    for callback in session.info.pop('on_commit', []):
+        callback()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_commit_callbacks(session: Session):
+    session.info.pop('on_commit', None)
 
 
 class BaseDAO:
     model = None
+    cache: Optional[TTLCache] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _tag_methods(cls)
 
     @classmethod
-    async def find_by_id(cls, model_id: int, filters: list[bool] = [], **filter_by):
-        async with async_session_maker() as session:
-            query = select(cls.model).where(*filters).filter_by(id=model_id, **filter_by)
-            result = await session.execute(query)
-            return result.scalar_one_or_none()
+    async def _fetch(cls, query, unpack, session: Optional[AsyncSession] = None):
+        async def load():
+            rows = await read()
+            tag((cls.model.__tablename__, row_id) for row_id in cls._row_ids(rows))
+            return rows
+
+        async def read():
+            replica = None
+            # A replica may not have the write that just cleared this cache yet, and caching its answer would
+            # keep the stale rows for a whole TTL.
+            if session is None and not (cls.cache is not None
+                                        and cls.cache.cleared_within(settings.READ_YOUR_WRITES_WINDOW)):
+                replica = read_replica()
+            if replica is not None:
+                try:
+                    async with replica.session_maker() as scoped:
+                        await checkout(scoped)
+                        return unpack(await scoped.execute(query))
+                except REPLICA_ERRORS:
+                    replicas.mark_down(replica)
+            async with session_scope(session) as scoped:
+                return unpack(await scoped.execute(query))
+
+        if session is not None or cls.cache is None:
+            return await load()
+        return await cls.cache.get_or_load(cls._cache_key(query), load)
+
+    @staticmethod
+    def _row_ids(rows) -> list[int]:
+        # Model instances and result rows that carry an id; aggregates and other shapes have none to tag.
+        rows = rows if isinstance(rows, list) else [rows]
+        return [row_id for row in rows if isinstance(row_id := getattr(row, 'id', None), int)]
+
+    @staticmethod
+    def _cache_key(query):
+        # The structural key covers loader options too and is far cheaper than compiling the SQL.
+        cache_key = query._generate_cache_key()
+        if cache_key is None:
+            compiled = query.compile()
+            return str(compiled), repr(compiled.params)
+        return cache_key.key, repr([bind.effective_value for bind in cache_key.bindparams])
 
     @classmethod
-    async def find_all(cls, filters: list[bool] = [], **filter_by):
-        async with async_session_maker() as session:
-            query = select(cls.model).where(*filters).filter_by(**filter_by)
-            result = await session.execute(query)
-            return result.scalars().all()
+    def last_modified(cls):
+        # Uncorrelated, so PostgreSQL runs it once per statement; selected next to a page it costs no extra query.
+        return select(func.max(cls.model.updated_at)).scalar_subquery().label('last_modified')
 
     @classmethod
-    async def find_one_or_none(cls, filters: list[bool] = [], **filter_by):
-        async with async_session_maker() as session:
-            query = select(cls.model).where(*filters).filter_by(**filter_by)
-            result = await session.execute(query)
-            return result.scalar_one_or_none()
+    def columns_for(cls, schema: type[BaseModel], model=None) -> list:
+        model = model or cls.model
+        return [getattr(model, name) for name in schema.model_fields]
 
     @classmethod
-    async def add(cls, **data):
-        async with async_session_maker() as session:
-            query = insert(cls.model).values(**data)
-            await session.execute(query)
-            await session.commit()
+    def _select(cls, columns: Sequence = (), options: Sequence = ()):
+        if columns:
+            return select(*columns), lambda result: result.all()
+        return select(cls.model).options(*options), lambda result: result.scalars().all()
+
+    @classmethod
+    def _invalidate(cls, session: AsyncSession, *tables: str):
+        tables = tables or (cls.model.__tablename__,)
+        note_write()
+        invalidate_tables(*tables)
+        on_commit(session, lambda: broadcast(tables))
+
+    @classmethod
+    def _invalidate_rows(cls, session: AsyncSession, ids: Sequence[int], table: Optional[str] = None):
+        """Drop only cached reads built from these rows; the write must not change which rows a filter matches."""
+        table = table or cls.model.__tablename__
+        note_write()
+        invalidate_rows(table, ids)
+        on_commit(session, lambda: broadcast_rows(table, ids))
 
     @classmethod
-    async def update(cls, filters: list[bool] = [], **data):
-        async with async_session_maker() as session:
+    async def find_by_id(cls, model_id: int, filters: list[bool] = [], session: Optional[AsyncSession] = None,
+                         options: Sequence = (), **filter_by):
+        query = select(cls.model).options(*options).where(*filters).filter_by(id=model_id, **filter_by)
+        return await cls._fetch(query, lambda result: result.scalar_one_or_none(), session)
+
+    @classmethod
+    async def find_all(cls, filters: list[bool] = [], session: Optional[AsyncSession] = None,
+                       columns: Sequence = (), options: Sequence = (), **filter_by):
+        query, unpack = cls._select(columns, options)
+        return await cls._fetch(query.where(*filters).filter_by(**filter_by), unpack, session)
+
+    @classmethod
+    async def find_page(cls, limit: int, after: Optional[str] = None, order_by=None, descending: bool = False,
+                        filters: list[bool] = [], session: Optional[AsyncSession] = None,
+                        columns: Sequence = (), options: Sequence = (), **filter_by):
+        query, unpack = cls._select(columns, options)
+        query = query.where(*filters).filter_by(**filter_by)
+        query = keyset(query, order_by, cls.model.id, limit, after, descending)
+        rows = await cls._fetch(query, unpack, session)
+        if order_by is None:
+            return make_page(rows, limit, lambda item: (item.id,))
+        return make_page(rows, limit, lambda item: (getattr(item, order_by.key), item.id))
+
+    @classmethod
+    async def stream(cls, filters: list[bool] = [], batch_size: int = 1000, **filter_by):
+        async with session_scope() as session:
+            columns = [attribute.columns[0] for attribute in inspect(cls.model).column_attrs if not attribute.deferred]
+            query = (select(*columns).where(*filters).filter_by(**filter_by)
+                     .order_by(cls.model.id).execution_options(yield_per=batch_size))
+            result = await session.stream(query)
+            async for partition in result.mappings().partitions():
+                yield partition
+
+    @classmethod
+    async def find_one_or_none(cls, filters: list[bool] = [], session: Optional[AsyncSession] = None,
+                               options: Sequence = (), **filter_by):
+        query = select(cls.model).options(*options).where(*filters).filter_by(**filter_by)
+        return await cls._fetch(query, lambda result: result.scalar_one_or_none(), session)
+
+    @classmethod
+    async def add(cls, session: Optional[AsyncSession] = None, **data):
+        async with session_scope(session, commit=True) as session:
+            query = insert(cls.model).values(**data).returning(cls.model.id)
+            result = await session.execute(query)
+            cls._invalidate(session)
+            return result.scalar_one()
+
+    @classmethod
+    async def update(cls, filters: list[bool] = [], session: Optional[AsyncSession] = None, **data):
+        async with session_scope(session, commit=True) as session:
             query = update(cls.model).where(*filters).values(**data)
             await session.execute(query)
-            await session.commit()
+            cls._invalidate(session)
+
+    @classmethod
+    async def add_many(cls, rows: list[dict], session: Optional[AsyncSession] = None) -> list[int]:
+        if not rows:
+            return []
+        async with session_scope(session, commit=True) as session:
+            result = await session.execute(insert(cls.model).returning(cls.model.id), rows)
+            cls._invalidate(session)
+            return result.scalars().all()
+
+    @classmethod
+    async def update_many(cls, rows: list[dict], session: Optional[AsyncSession] = None):
+        if not rows:
+            return
+        async with session_scope(session, commit=True) as session:
+            await session.execute(update(cls.model), rows)
+            cls._invalidate(session)
+
+    @classmethod
+    async def upsert_many(cls, rows: list[dict], index_elements: Sequence[str] = ('slug',),
+                          update_columns: Optional[Sequence[str]] = None,
+                          session: Optional[AsyncSession] = None) -> list[int]:
+        if not rows:
+            return []
+        # One multi-row INSERT cannot touch the same conflict target twice, so the last row wins.
+        rows = list({tuple(row[key] for key in index_elements): row for row in rows}.values())
+        if update_columns is None:
+            update_columns = [key for key in rows[0] if key not in index_elements]
+        query = pg_insert(cls.model)
+        query = query.on_conflict_do_update(index_elements=list(index_elements),
+                                            set_={column: query.excluded[column] for column in update_columns})
+        async with session_scope(session, commit=True) as session:
+            result = await session.execute(query.returning(cls.model.id), rows)
+            cls._invalidate(session)
+            return result.scalars().all()
+
+
+def _tag_methods(cls):
+    for name, attribute in list(vars(cls).items()):
+        if isinstance(attribute, classmethod) and not name.startswith('_'):
+            setattr(cls, name, classmethod(tag_dao_method(attribute.__func__)))
+
 
+_tag_methods(BaseDAO)
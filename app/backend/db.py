@@ -1,13 +1,72 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import DeclarativeBase
 
+from app.backend.metrics import Counter, Gauge, collector, instrument_engine
 from app.config import settings
 
-engine = create_async_engine(f'postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASS}@{settings.DB_HOST}:'
-                             f'{settings.DB_PORT}/{settings.DB_NAME}', echo=True)
+pool_events = {'connect': 0, 'checkout': 0, 'checkin': 0, 'invalidate': 0}
+
+
+def _count_pool_event(name: str):
+    def listener(*args):
+        pool_events[name] += 1
+    return listener
+
+
+def build_engine(url: str) -> AsyncEngine:
+    connect_args = {'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+                    'prepared_statement_cache_size': settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+    if settings.DB_COMMAND_TIMEOUT is not None:
+        connect_args['command_timeout'] = settings.DB_COMMAND_TIMEOUT
+    if settings.DB_PGBOUNCER:
+        connect_args['prepared_statement_name_func'] = lambda: f'__asyncpg_{uuid4()}__'
+    else:
+        # PgBouncer refuses unknown startup parameters; behind it, set this on the database role instead.
+        connect_args['server_settings'] = {'pg_trgm.word_similarity_threshold': str(settings.SEARCH_WORD_SIMILARITY)}
+
+    new_engine = create_async_engine(url,
+                                     echo=settings.DB_ECHO,
+                                     pool_size=settings.DB_POOL_SIZE,
+                                     max_overflow=settings.DB_MAX_OVERFLOW,
+                                     pool_timeout=settings.DB_POOL_TIMEOUT,
+                                     pool_recycle=settings.DB_POOL_RECYCLE,
+                                     pool_pre_ping=settings.DB_POOL_PRE_PING,
+                                     pool_use_lifo=settings.DB_POOL_USE_LIFO,
+                                     connect_args=connect_args)
+    for name in pool_events:
+        event.listen(new_engine.sync_engine.pool, name, _count_pool_event(name))
+    instrument_engine(new_engine)
+    return new_engine
+
+
+def pool_status(target: Optional[AsyncEngine] = None) -> dict:
+    pool = (target or engine).sync_engine.pool
+    return {'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            **pool_events}
+
+
+engine = build_engine(settings.database_url)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+pool_connections = Gauge('db_pool_connections', 'Pooled connections by state.', ('state',))
+pool_event_count = Counter('db_pool_events_total', 'Pool connect/checkout/checkin/invalidate events.', ('event',))
+
+
+@collector
+def _collect_pool():
+    status = pool_status()
+    for state in ('size', 'checked_in', 'checked_out', 'overflow'):
+        pool_connections.set(state, value=status[state])
+    for name in pool_events:
+        pool_event_count.set(name, value=status[name])
+
 
 class Base(DeclarativeBase):
     pass
-
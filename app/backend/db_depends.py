@@ -1,7 +1,9 @@
-from sqlalchemy.ext.asyncio import AsyncSession
 from app.backend.db import async_session_maker
+from app.backend.dao import checkout
 
 
 async def get_db():
     async with async_session_maker() as session:
-        yield session
+        async with session.begin():
+            await checkout(session)
+            yield session
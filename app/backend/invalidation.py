@@ -0,0 +1,186 @@
+import asyncio
+import glob
+import logging
+import os
+import socket
+from typing import Iterable, Optional
+from uuid import uuid4
+
+import asyncpg
+
+from app.backend.cache import invalidate_rows, invalidate_tables, watched_tables
+from app.config import settings
+
+CHANNEL = 'dao_invalidate'
+# Keeps a NOTIFY payload well under PostgreSQL's 8000 byte limit; larger sets invalidate the whole table.
+MAX_ROW_IDS = 500
+worker_id = f'{os.getpid()}-{uuid4().hex[:8]}'
+logger = logging.getLogger(__name__)
+
+
+def _encode(tables: Iterable[str], ids: Iterable[int] = ()) -> str:
+    payload = f'{worker_id}:{",".join(sorted(tables))}'
+    ids = ','.join(map(str, ids))
+    return f'{payload}:{ids}' if ids else payload
+
+
+def _receive(payload: str):
+    sender, _, tables = payload.partition(':')
+    tables, _, ids = tables.partition(':')
+    if sender == worker_id or not tables:
+        return
+    if ids:
+        invalidate_rows(tables, [int(row_id) for row_id in ids.split(',')])
+    else:
+        invalidate_tables(*tables.split(','))
+
+
+def _invalidate_everything():
+    invalidate_tables(*watched_tables())
+
+
+class InvalidationBus:
+    started = False
+
+    async def start(self):
+        self.started = True
+
+    async def stop(self):
+        pass
+
+    def publish(self, tables: Iterable[str], ids: Iterable[int] = ()):
+        pass
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._connection: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = False
+
+    async def start(self):
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(CHANNEL, self._on_notify)
+        self._connection.add_termination_listener(self._on_terminate)
+        self.started = True
+
+    async def stop(self):
+        self._stopping = True
+        for task in list(self._tasks):
+            task.cancel()
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+
+    def publish(self, tables: Iterable[str], ids: Iterable[int] = ()):
+        self._spawn(self._notify(_encode(tables, ids)))
+
+    def _spawn(self, coroutine):
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _notify(self, payload: str):
+        try:
+            async with self._lock:
+                await self._connection.execute('SELECT pg_notify($1, $2)', CHANNEL, payload)
+        except (asyncpg.PostgresError, OSError, AttributeError):
+            logger.warning('Could not publish cache invalidation %s', payload, exc_info=True)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        _receive(payload)
+
+    def _on_terminate(self, connection):
+        if not self._stopping:
+            self._spawn(self._reconnect())
+
+    async def _reconnect(self):
+        delay = 0.1
+        while not self._stopping:
+            try:
+                await self.start()
+            except (asyncpg.PostgresError, OSError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5)
+                continue
+            # Anything published while we were disconnected is lost.
+            _invalidate_everything()
+            return
+
+
+class _DatagramReceiver(asyncio.DatagramProtocol):
+    def datagram_received(self, data, addr):
+        _receive(data.decode())
+
+
+class UnixSocketInvalidationBus(InvalidationBus):
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, f'{worker_id}.sock')
+        self._transport = None
+        self._sender: Optional[socket.socket] = None
+
+    async def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(_DatagramReceiver, local_addr=self.path,
+                                                                 family=socket.AF_UNIX)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self.started = True
+
+    async def stop(self):
+        if self._transport is not None:
+            self._transport.close()
+        if self._sender is not None:
+            self._sender.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def publish(self, tables: Iterable[str], ids: Iterable[int] = ()):
+        payload = _encode(tables, ids).encode()
+        for path in glob.glob(os.path.join(self.directory, '*.sock')):
+            if path == self.path:
+                continue
+            try:
+                self._sender.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                logger.warning('Cache invalidation dropped for %s', path)
+
+
+def create_bus() -> InvalidationBus:
+    if settings.CACHE_INVALIDATION_BACKEND == 'postgres':
+        dsn = settings.CACHE_INVALIDATION_DSN or settings.database_url.replace('+asyncpg', '')
+        return PostgresInvalidationBus(dsn)
+    if settings.CACHE_INVALIDATION_BACKEND == 'unix':
+        return UnixSocketInvalidationBus(settings.CACHE_INVALIDATION_SOCKET_DIR)
+    return InvalidationBus()
+
+
+bus = create_bus()
+
+
+def broadcast(tables: Iterable[str]):
+    tables = tuple(tables)
+    invalidate_tables(*tables)
+    # Every worker builds the same caches, so one that caches none of these tables has nobody to tell.
+    if bus.started and watched_tables().intersection(tables):
+        bus.publish(tables)
+
+
+def broadcast_rows(table: str, ids: Iterable[int]):
+    ids = tuple(ids)
+    if len(ids) > MAX_ROW_IDS:
+        broadcast((table,))
+        return
+    invalidate_rows(table, ids)
+    if bus.started and table in watched_tables():
+        bus.publish((table,), ids)
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, Iterable, Optional
+
+
+class BatchLoader:
+    """Collects keys requested by concurrent callers and resolves them with one batch call.
+
+    Keys asked for while a batch is pending or in flight share its result instead of starting another query.
+    Nothing is kept once a batch resolves; caching is left to the DAO caches.
+    """
+
+    def __init__(self, batch: Callable[[list], Awaitable[dict]], max_batch_size: int = 500, delay: float = 0):
+        self.batch = batch
+        self.max_batch_size = max_batch_size
+        self.delay = delay
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self._scheduled: Optional[asyncio.Handle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable):
+        return (await self.load_many([key]))[0]
+
+    async def load_many(self, keys: Iterable[Hashable]) -> list:
+        futures = [self._future(key) for key in keys]
+        # Shielded: one caller giving up must not cancel the result other callers are waiting for.
+        return await asyncio.shield(asyncio.gather(*futures))
+
+    def _future(self, key: Hashable) -> asyncio.Future:
+        future = self._in_flight.get(key) or self._pending.get(key)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = self._pending[key] = loop.create_future()
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._scheduled is None:
+            self._scheduled = loop.call_later(self.delay, self._dispatch) if self.delay \
+                else loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self):
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._scheduled = None
+        if self._pending:
+            batch, self._pending = self._pending, {}
+            self._in_flight.update(batch)
+            task = asyncio.get_running_loop().create_task(self._resolve(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch: dict[Hashable, asyncio.Future]):
+        try:
+            results = await self.batch(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(key))
+        finally:
+            for key, future in batch.items():
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
@@ -0,0 +1,221 @@
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+current_dao: ContextVar[Optional[str]] = ContextVar('current_dao', default=None)
+metrics: list['Metric'] = []
+collectors: list[Callable[[], None]] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: tuple) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values: dict[tuple, float] = {}
+        metrics.append(self)
+
+    def set(self, *labels, value: float):
+        self.values[labels] = value
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in list(self.values.items()):
+            lines.append(f'{self.name}{_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, *labels, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            # Per-bucket (non-cumulative) counts, then sum and count.
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        names = self.label_names + ('le',)
+        for labels, series in list(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {series[-2]}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {series[-1]}')
+        return lines
+
+
+http_requests = Counter('http_requests_total', 'HTTP requests by route template and status.',
+                        ('method', 'route', 'status'))
+http_latency = Histogram('http_request_duration_seconds', 'HTTP request latency by route template.',
+                         ('method', 'route'))
+http_in_flight = Gauge('http_requests_in_flight', 'HTTP requests currently being served.')
+db_query_latency = Histogram('db_query_duration_seconds', 'SQL statement execution time by DAO method.',
+                             ('dao',))
+db_query_rows = Counter('db_query_rows_total', 'Rows returned or affected by DAO method.', ('dao',))
+db_pool_wait = Histogram('db_pool_wait_seconds', 'Time spent waiting for a pooled connection.', ('dao',))
+
+
+class DecayingAverage:
+    """Exponential moving average that also halves every `half_life` seconds without samples, so it recovers
+    even when nothing is being measured (for instance while every request is being shed)."""
+
+    def __init__(self, alpha: float, half_life: float):
+        self.alpha = alpha
+        self.half_life = half_life
+        self._value = 0.0
+        self._updated = time.monotonic()
+
+    def _decayed(self, now: float) -> float:
+        return self._value * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def observe(self, value: float):
+        now = time.monotonic()
+        self._value = self._decayed(now) * (1 - self.alpha) + value * self.alpha
+        self._updated = now
+
+    def value(self) -> float:
+        return self._decayed(time.monotonic())
+
+
+pool_wait_average = DecayingAverage(alpha=0.1, half_life=2)
+
+
+def render_metrics() -> str:
+    for collect in collectors:
+        collect()
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def collector(func: Callable[[], None]) -> Callable[[], None]:
+    collectors.append(func)
+    return func
+
+
+def route_label(scope: Scope) -> str:
+    route = scope.get('route')
+    if route is not None:
+        return scope.get('root_path', '') + route.path
+    if scope.get('endpoint') is not None:
+        # Mounted apps such as StaticFiles: one series for the whole mount.
+        return scope.get('root_path', '')
+    # Unmatched paths would otherwise give every scanner URL its own series.
+    return '<unmatched>'
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, exclude_paths: Sequence[str] = ('/metrics',)):
+        self.app = app
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope['path'] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        http_in_flight.inc(amount=1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.inc(amount=-1)
+            route = route_label(scope)
+            http_latency.observe(scope['method'], route, value=elapsed)
+            http_requests.inc(scope['method'], route, status_code)
+
+
+def tag_dao_method(func):
+    if not inspect.iscoroutinefunction(func):
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(cls, *args, **kwargs):
+        if current_dao.get() is not None:
+            return await func(cls, *args, **kwargs)
+        token = current_dao.set(f'{cls.__name__}.{func.__name__}')
+        try:
+            return await func(cls, *args, **kwargs)
+        finally:
+            current_dao.reset(token)
+
+    return wrapper
+
+
+def instrument_engine(target: AsyncEngine):
+    sync_engine = target.sync_engine
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.query_started
+        dao = current_dao.get() or 'other'
+        db_query_latency.observe(dao, value=elapsed)
+        rows = cursor.rowcount
+        if rows is not None and rows > 0:
+            db_query_rows.inc(dao, amount=rows)
+
+
+def observe_pool_wait(elapsed: float):
+    db_pool_wait.observe(current_dao.get() or 'other', value=elapsed)
+    pool_wait_average.observe(elapsed)
@@ -0,0 +1,85 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, literal, tuple_
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise invalid_cursor()
+    return values
+
+
+def cursor_value(value, sql_type):
+    """Convert a decoded cursor value back to the key column's Python type, or reject it with a 400."""
+    try:
+        python_type = sql_type.python_type
+    except NotImplementedError:
+        python_type = None
+    try:
+        if python_type is None:
+            if value is None or isinstance(value, (dict, list)):
+                raise ValueError
+            return value
+        if python_type is bool:
+            if isinstance(value, bool):
+                return value
+        elif python_type is int:
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+        elif python_type is float:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return float(value)
+        elif python_type is Decimal:
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                return Decimal(str(value))
+        elif python_type in (datetime, date):
+            # encode_cursor writes these with str(), which fromisoformat reads back.
+            if isinstance(value, str):
+                return python_type.fromisoformat(value)
+        elif isinstance(value, python_type):
+            return value
+    except (ValueError, InvalidOperation):
+        pass
+    raise invalid_cursor()
+
+
+def keyset(query: Select, order_by, id_column, limit: int, after: Optional[str] = None,
+           descending: bool = False) -> Select:
+    if order_by is None or order_by is id_column:
+        keys = (id_column,)
+    else:
+        keys = (order_by, id_column)
+
+    if after is not None:
+        values = decode_cursor(after, len(keys))
+        left = tuple_(*keys)
+        right = tuple_(*[literal(cursor_value(value, key.type), key.type) for key, value in zip(keys, values)])
+        query = query.where(left < right if descending else left > right)
+
+    ordering = [key.desc() if descending else key.asc() for key in keys]
+    return query.order_by(*ordering).limit(limit + 1)
+
+
+def make_page(rows: Sequence, limit: int, key: Callable[[Any], tuple]) -> dict:
+    items = list(rows[:limit])
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > limit else None
+    return {'items': items, 'next_cursor': next_cursor}
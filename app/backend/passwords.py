@@ -0,0 +1,69 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.backend.metrics import Counter, Gauge, collector
+from app.config import settings
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int, workers: int, max_pending: int):
+        self.context = CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=rounds)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hasher')
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail='Too many authentication requests, try again later',
+                                headers={'Retry-After': '1'})
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            elapsed = time.perf_counter() - started
+            self.calls += 1
+            self.seconds_total += elapsed
+            self.seconds_max = max(self.seconds_max, elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {'pending': self.pending,
+                'calls': self.calls,
+                'rejected': self.rejected,
+                'seconds_total': self.seconds_total,
+                'seconds_max': self.seconds_max}
+
+
+password_hasher = PasswordHasher(settings.BCRYPT_ROUNDS,
+                                 settings.PASSWORD_HASH_WORKERS,
+                                 settings.PASSWORD_HASH_MAX_PENDING)
+
+hasher_pending = Gauge('password_hash_pending', 'Password hash/verify calls queued or running.')
+hasher_calls = Counter('password_hash_calls_total', 'Password hash/verify calls, by outcome.', ('outcome',))
+hasher_seconds = Counter('password_hash_seconds_total', 'Time spent hashing and verifying passwords.')
+
+
+@collector
+def _collect_hasher():
+    stats = password_hasher.stats()
+    hasher_pending.set(value=stats['pending'])
+    hasher_calls.set('completed', value=stats['calls'])
+    hasher_calls.set('rejected', value=stats['rejected'])
+    hasher_seconds.set(value=stats['seconds_total'])
@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.backend.db import engine
+
+
+@contextmanager
+def capture_queries(target: Optional[AsyncEngine] = None):
+    sync_engine = (target or engine).sync_engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@contextmanager
+def assert_num_queries(expected: int, target: Optional[AsyncEngine] = None):
+    with capture_queries(target) as statements:
+        yield statements
+    if len(statements) != expected:
+        issued = '\n'.join(statement for statement, _ in statements)
+        raise AssertionError(f'Expected {expected} queries, {len(statements)} were issued:\n{issued}')
@@ -0,0 +1,155 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+import asyncpg
+import orjson
+from jose import JWTError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.backend.metrics import Counter, pool_wait_average
+from app.backend.tokens import decode_token
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+rejected_requests = Counter('http_requests_rejected_total', 'Requests refused before reaching a route.',
+                            ('reason',))
+
+
+class RateLimiter:
+    """Token buckets: each key holds up to `burst` tokens and regains `rate` per second."""
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Spend one token; returns 0 when allowed, otherwise the seconds until a token is available."""
+        return 0.0
+
+
+class MemoryRateLimiter(RateLimiter):
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+        self._buckets[key] = (tokens - 1 if tokens >= 1 else tokens, now)
+        if len(self._buckets) > self.max_keys:
+            # Least recently seen first; a dropped client simply starts again with a full bucket.
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class PostgresRateLimiter(RateLimiter):
+    # One upsert per request; an UNLOGGED table because losing the buckets on a crash only resets the limits.
+    statement = """
+        INSERT INTO rate_limit_buckets AS bucket (key, tokens, updated_at) VALUES ($1, $3 - 1, clock_timestamp())
+        ON CONFLICT (key) DO UPDATE
+        SET tokens = least($3, bucket.tokens
+                               + extract(epoch FROM clock_timestamp() - bucket.updated_at) * $2) - 1,
+            updated_at = clock_timestamp()
+        WHERE least($3, bucket.tokens + extract(epoch FROM clock_timestamp() - bucket.updated_at) * $2) >= 1
+        RETURNING tokens
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._pool: Optional[asyncpg.Pool] = None
+
+    async def start(self):
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=settings.RATE_LIMIT_POOL_SIZE)
+
+    async def stop(self):
+        if self._pool is not None:
+            await self._pool.close()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        try:
+            allowed = await self._pool.fetchval(self.statement, key, rate, burst)
+        except (asyncpg.PostgresError, OSError, AttributeError):
+            # Failing open: a broken limiter store must not take the API down with it.
+            logger.warning('Rate limit check failed for %s', key, exc_info=True)
+            return 0.0
+        return 0.0 if allowed is not None else 1 / rate
+
+
+def create_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == 'postgres':
+        return PostgresRateLimiter(settings.RATE_LIMIT_DSN or settings.database_url.replace('+asyncpg', ''))
+    if settings.RATE_LIMIT_BACKEND == 'memory':
+        return MemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+    return RateLimiter()
+
+
+limiter = create_limiter()
+
+
+def client_key(scope: Scope) -> str:
+    scheme, _, token = Headers(scope=scope).get('authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        try:
+            user_id = decode_token(token).get('id')
+        except JWTError:
+            user_id = None
+        if user_id is not None:
+            return f'user:{user_id}'
+    client = scope.get('client')
+    return f'ip:{client[0] if client else "unknown"}'
+
+
+def budget_for(path: str, budgets: dict[str, Sequence[float]]) -> Optional[tuple[str, float, float]]:
+    prefix = max((prefix for prefix in budgets if path.startswith(prefix)), key=len, default=None)
+    if prefix is None:
+        return None
+    rate, burst = budgets[prefix]
+    return prefix, rate, burst
+
+
+async def reject(send: Send, status: int, detail: str, retry_after: float):
+    body = orjson.dumps({'detail': detail})
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+                            (b'retry-after', str(max(1, math.ceil(retry_after))).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class AdmissionMiddleware:
+    """Sheds load with 503 while connections wait too long, then 429s clients that exceed their budget."""
+
+    def __init__(self, app: ASGIApp, budgets: dict[str, Sequence[float]], rate_limiter: RateLimiter,
+                 max_pool_wait: Optional[float] = None, exclude_paths: Sequence[str] = ()):
+        self.app = app
+        self.budgets = budgets
+        self.rate_limiter = rate_limiter
+        self.max_pool_wait = max_pool_wait
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope['path'].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        if self.max_pool_wait is not None and pool_wait_average.value() > self.max_pool_wait:
+            rejected_requests.inc('admission')
+            await reject(send, 503, 'Service is overloaded, try again later', 1)
+            return
+
+        budget = budget_for(scope['path'], self.budgets)
+        if budget is not None:
+            prefix, rate, burst = budget
+            wait = await self.rate_limiter.take(f'{prefix}|{client_key(scope)}', rate, burst)
+            if wait > 0:
+                rejected_requests.inc('rate_limit')
+                await reject(send, 429, 'Too many requests', wait)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,103 @@
+import logging
+import math
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import Optional, Sequence
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.backend.db import build_engine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+# Set per request by ReplicaRoutingMiddleware. A dict rather than a flag so that writes made in child tasks,
+# which run on a copy of the context, are still seen by the middleware.
+routing: ContextVar[Optional[dict]] = ContextVar('routing', default=None)
+REPLICA_ERRORS = (OperationalError, InterfaceError, OSError, TimeoutError)
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+        self.down_until = 0.0
+
+
+class ReplicaSet:
+    def __init__(self, urls: Sequence[str], retry_after: float):
+        self.replicas = [Replica(build_engine(url)) for url in urls]
+        self.retry_after = retry_after
+        self._next = 0
+
+    def choose(self) -> Optional[Replica]:
+        """Round robin over healthy replicas; None means read from the primary."""
+        now = time.monotonic()
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(self._next + offset) % len(self.replicas)]
+            if replica.down_until <= now:
+                self._next = (self._next + offset + 1) % len(self.replicas)
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica):
+        logger.warning('Replica %s failed, reading from the primary for %ss', replica.engine.url, self.retry_after,
+                       exc_info=True)
+        replica.down_until = time.monotonic() + self.retry_after
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replicas = ReplicaSet(settings.DB_REPLICA_URLS, settings.DB_REPLICA_RETRY_AFTER)
+
+
+def read_replica() -> Optional[Replica]:
+    state = routing.get()
+    if state is not None and state['primary']:
+        return None
+    return replicas.choose()
+
+
+def note_write():
+    state = routing.get()
+    if state is not None:
+        state['primary'] = state['wrote'] = True
+
+
+class ReplicaRoutingMiddleware:
+    """Keeps a client on the primary for `window` seconds after it writes, so it reads its own writes."""
+
+    def __init__(self, app: ASGIApp, cookie: str = 'primary_until', window: float = 5):
+        self.app = app
+        self.cookie = cookie
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        cookies = SimpleCookie(Headers(scope=scope).get('cookie', ''))
+        try:
+            primary = float(cookies[self.cookie].value) > time.time()
+        except (KeyError, ValueError):
+            primary = False
+        state = {'primary': primary, 'wrote': False}
+
+        async def send_wrapper(message: Message):
+            if message['type'] == 'http.response.start' and state['wrote']:
+                MutableHeaders(scope=message).append(
+                    'set-cookie', f'{self.cookie}={time.time() + self.window:.3f}; Max-Age={math.ceil(self.window)}; '
+                                  f'Path=/; HttpOnly; SameSite=Lax')
+            await send(message)
+
+        token = routing.set(state)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            routing.reset(token)
@@ -0,0 +1,7 @@
+import orjson
+from pydantic import BaseModel
+
+
+def render_json(schema: type[BaseModel], content) -> bytes:
+    return orjson.dumps(schema.model_validate(content).model_dump())
+
@@ -0,0 +1,72 @@
+import csv
+import io
+from itertools import islice
+from typing import AsyncIterator, BinaryIO, Iterator
+
+import orjson
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+
+async def encode_ndjson(partitions: AsyncIterator, schema: type[BaseModel]) -> AsyncIterator[bytes]:
+    async for partition in partitions:
+        yield b''.join(orjson.dumps(schema.model_validate(row).model_dump()) + b'\n' for row in partition)
+
+
+async def encode_csv(partitions: AsyncIterator, schema: type[BaseModel]) -> AsyncIterator[bytes]:
+    fields = list(schema.model_fields)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    async for partition in partitions:
+        writer.writerows(schema.model_validate(row).model_dump() for row in partition)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _decode_lines(file: BinaryIO) -> Iterator[tuple[int, object]]:
+    # Decoded line by line so one bad byte costs a line, not the request; utf-8-sig drops the BOM Excel writes.
+    for line_number, line in enumerate(file, start=1):
+        try:
+            yield line_number, line.decode('utf-8-sig' if line_number == 1 else 'utf-8')
+        except UnicodeDecodeError as exc:
+            yield line_number, ValueError(f'Not valid UTF-8 at byte {exc.start}')
+
+
+def _read_rows(file: BinaryIO, fmt: str) -> Iterator[tuple[int, object]]:
+    lines = _decode_lines(file)
+    if fmt == 'csv':
+        failed = []
+
+        def text():
+            for line_number, line in lines:
+                if isinstance(line, Exception):
+                    # A quoted field may continue past this line, so the rest of the file cannot be trusted.
+                    failed.append((line_number, ValueError(f'{line}; the rest of the file was not read')))
+                    return
+                yield line
+
+        reader = csv.DictReader(text())
+        for row in reader:
+            yield reader.line_num, row
+        yield from failed
+        return
+    for line_number, line in lines:
+        if isinstance(line, Exception):
+            yield line_number, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_number, orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            yield line_number, exc
+
+
+async def read_batches(file: BinaryIO, fmt: str, batch_size: int) -> AsyncIterator[list[tuple[int, object]]]:
+    rows = _read_rows(file, fmt)
+    while batch := await run_in_threadpool(lambda: list(islice(rows, batch_size))):
+        yield batch
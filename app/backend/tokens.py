@@ -0,0 +1,29 @@
+import hashlib
+import time
+
+from jose import jwk, jwt
+
+from app.backend.cache import MISSING, TTLCache
+from app.config import settings
+
+signing_key = jwk.construct(settings.JWT_PRIVATE_KEY or settings.JWT_SECRET_KEY, settings.JWT_ALGORITHM)
+verifying_key = jwk.construct(settings.JWT_PUBLIC_KEY or settings.JWT_SECRET_KEY, settings.JWT_ALGORITHM)
+token_cache = TTLCache('tokens', ttl=settings.JWT_CACHE_MAX_TTL, maxsize=settings.JWT_CACHE_SIZE)
+
+
+def encode_token(claims: dict) -> str:
+    return jwt.encode(claims, signing_key, algorithm=settings.JWT_ALGORITHM)
+
+
+def decode_token(token: str) -> dict:
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = token_cache.get(key)
+    if payload is not MISSING:
+        return payload
+
+    payload = jwt.decode(token, verifying_key, algorithms=[settings.JWT_ALGORITHM])
+    if (expire := payload.get('exp')) is not None:
+        ttl = min(expire - time.time(), settings.JWT_CACHE_MAX_TTL)
+        if ttl > 0:
+            token_cache.set(key, payload, ttl)
+    return payload
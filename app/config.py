@@ -1,5 +1,7 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, model_validator
 
 
 class Settings(BaseSettings):
@@ -10,9 +12,94 @@ class Settings(BaseSettings):
     DB_NAME: str
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
+    JWT_PRIVATE_KEY: Optional[str] = None
+    JWT_PUBLIC_KEY: Optional[str] = None
+    JWT_CACHE_SIZE: int = 10000
+    JWT_CACHE_MAX_TTL: float = 300
+    DEFAULT_PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 200
+    BULK_IMPORT_MAX_ROWS: int = 50000
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+    EXPORT_BATCH_SIZE: int = 2000
+    PRICE_FACET_BOUNDS: list[int] = [100, 500, 1000, 5000, 10000]
+    # pg_trgm's default of 0.6 misses one-letter typos in short words ("wodden" scores 0.57 against "wooden").
+    SEARCH_WORD_SIMILARITY: float = 0.5
+    CATALOG_MAX_AGE: int = 10
+    CATALOG_STALE_WHILE_REVALIDATE: int = 60
+
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_EXCLUDE_PATHS: list[str] = []
+    STATIC_MAX_AGE: int = 3600
+    TEMPLATE_BYTECODE_CACHE_DIR: Optional[str] = '/tmp/store-jinja-cache'
+    PAGES_CACHE_TTL: int = 300
+    PAGES_STREAM_MIN_ITEMS: int = 200
+    PAGES_STREAM_CHUNK_SIZE: int = 16384
+    ORDER_MAX_ITEMS: int = 100
+    ORDER_RESERVATION_TTL: float = 900
+    ORDER_SWEEP_INTERVAL: float = 30
+    ORDER_SWEEP_BATCH: int = 500
+    REVIEW_SUMMARY_MAX_PRODUCTS: int = 100
+    REVIEW_SUMMARY_MAX_REVIEWS: int = 10
+    REVIEW_LOADER_DELAY: float = 0.002
+    RATE_LIMIT_BACKEND: str = 'memory'
+    RATE_LIMIT_DSN: Optional[str] = None
+    RATE_LIMIT_POOL_SIZE: int = 5
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    # Path prefix -> [tokens per second, burst]; the longest matching prefix applies.
+    RATE_LIMITS: dict[str, list[float]] = {
+        '/v1/auth/token': [0.5, 10],
+        '/v1/auth/': [2, 20],
+        '/v1/products': [20, 100],
+        '/v1/orders': [5, 20],
+        '/v1/': [50, 200],
+    }
+    ADMISSION_MAX_POOL_WAIT: Optional[float] = 0.25
+    ADMISSION_EXCLUDE_PATHS: list[str] = ['/metrics', '/v1/static']
+
+    APP_ENV: str = 'development'
+    DB_ECHO: Optional[bool] = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_USE_LIFO: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: Optional[float] = 60
+    DB_PGBOUNCER: bool = False
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_RETRY_AFTER: float = 30
+    READ_YOUR_WRITES_COOKIE: str = 'primary_until'
+    READ_YOUR_WRITES_WINDOW: float = 5
+    CACHE_ENABLED: bool = True
+    CACHE_INVALIDATION_BACKEND: str = 'postgres'
+    CACHE_INVALIDATION_DSN: Optional[str] = None
+    CACHE_INVALIDATION_SOCKET_DIR: str = '/tmp/store-cache-bus'
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
 
     class Config:
         env_file = '.env'
 
+    @model_validator(mode='after')
+    def apply_profile(self):
+        if self.APP_ENV == 'production':
+            self.DB_ECHO = False
+        elif self.DB_ECHO is None:
+            self.DB_ECHO = True
+        if self.DB_PGBOUNCER:
+            self.DB_STATEMENT_CACHE_SIZE = 0
+            self.DB_PREPARED_STATEMENT_CACHE_SIZE = 0
+        return self
+
+    @property
+    def database_url(self) -> str:
+        return f'postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}'
+
 
 settings = Settings()
@@ -1,4 +1,5 @@
 from .category import CategoryDAO
-from .products import ProductDAO
+from .products import ProductDAO, ProductQuery
 from .user import UserDAO
 from .reviews import ReviewDAO
+from .orders import OrderDAO
@@ -1,7 +1,121 @@
-from app.models import Category
-from app.backend.dao import BaseDAO
+import asyncio
+from typing import Optional
+
+from sqlalchemy import delete, insert, literal, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models import Category, CategoryClosure
+from app.backend.cache import TTLCache, on_invalidate
+from app.backend.dao import BaseDAO, session_scope
+
+
+class CategoryTree:
+    def __init__(self):
+        self._ids: Optional[dict[str, int]] = None
+        self._descendants: Optional[dict[int, list[int]]] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._generation += 1
+        self._ids = None
+        self._descendants = None
+
+    async def _load(self):
+        async with self._lock:
+            if self._descendants is not None:
+                return
+            generation = self._generation
+            ids, descendants = await CategoryDAO.load_tree()
+            if generation == self._generation:
+                self._ids, self._descendants = ids, descendants
+
+    async def descendant_ids(self, category_id: Optional[int] = None,
+                             slug: Optional[str] = None) -> Optional[list[int]]:
+        if self._descendants is None:
+            await self._load()
+        ids, descendants = self._ids, self._descendants
+        if ids is None or descendants is None:
+            ids, descendants = await CategoryDAO.load_tree()
+        if slug is not None:
+            category_id = ids.get(slug)
+        return descendants.get(category_id)
+
+
+category_tree = CategoryTree()
+on_invalidate(('categories', 'category_closure'), category_tree.invalidate)
 
 
 class CategoryDAO(BaseDAO):
     model = Category
+    cache = TTLCache('categories', ttl=300, maxsize=1024, tables=('categories',))
+
+    @classmethod
+    async def load_tree(cls) -> tuple[dict[str, int], dict[int, list[int]]]:
+        ancestor = aliased(Category)
+        descendant = aliased(Category)
+        async with session_scope() as session:
+            query = (select(ancestor.id, ancestor.slug, CategoryClosure.descendant_id)
+                     .join(ancestor, ancestor.id == CategoryClosure.ancestor_id)
+                     .join(descendant, descendant.id == CategoryClosure.descendant_id)
+                     .where(ancestor.is_active, descendant.is_active))
+            result = await session.execute(query)
+            ids, descendants = {}, {}
+            for ancestor_id, slug, descendant_id in result.all():
+                ids[slug] = ancestor_id
+                descendants.setdefault(ancestor_id, []).append(descendant_id)
+        return ids, descendants
+
+    @classmethod
+    async def descendant_ids(cls, category_id: Optional[int] = None,
+                             slug: Optional[str] = None) -> Optional[list[int]]:
+        return await category_tree.descendant_ids(category_id, slug)
+
+    @classmethod
+    async def add(cls, session: Optional[AsyncSession] = None, **data):
+        async with session_scope(session, commit=True) as session:
+            category_id = await super().add(session=session, **data)
+            links = union_all(
+                select(CategoryClosure.ancestor_id, literal(category_id), CategoryClosure.depth + 1)
+                .where(CategoryClosure.descendant_id == data.get('parent_id')),
+                select(literal(category_id), literal(category_id), literal(0))
+            )
+            await session.execute(insert(CategoryClosure).from_select(['ancestor_id', 'descendant_id', 'depth'],
+                                                                      links))
+        return category_id
+
+    @classmethod
+    async def update(cls, filters: list[bool] = [], session: Optional[AsyncSession] = None, **data) -> bool:
+        """Returns False, changing nothing, when the new parent is inside a moved category's own subtree."""
+        async with session_scope(session, commit=True) as session:
+            moved = []
+            if 'parent_id' in data:
+                # Moves take turns, so two of them cannot each pass the check below and close a cycle together.
+                await session.execute(text('LOCK TABLE category_closure IN SHARE ROW EXCLUSIVE MODE'))
+                query = select(cls.model.id).where(*filters,
+                                                   cls.model.parent_id.is_distinct_from(data['parent_id']))
+                moved = (await session.execute(query)).scalars().all()
+                cycle = select(CategoryClosure.ancestor_id).where(CategoryClosure.ancestor_id.in_(moved),
+                                                                  CategoryClosure.descendant_id == data['parent_id'])
+                if moved and (await session.execute(cycle.limit(1))).first() is not None:
+                    return False
+            await super().update(filters=filters, session=session, **data)
+            for category_id in moved:
+                await cls._move_subtree(session, category_id, data['parent_id'])
+        return True
+
+    @classmethod
+    async def _move_subtree(cls, session: AsyncSession, category_id: int, parent_id: Optional[int]):
+        subtree = select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+        old_ancestors = select(CategoryClosure.ancestor_id).where(CategoryClosure.descendant_id == category_id,
+                                                                  CategoryClosure.ancestor_id != category_id)
+        await session.execute(delete(CategoryClosure).where(CategoryClosure.descendant_id.in_(subtree),
+                                                            CategoryClosure.ancestor_id.in_(old_ancestors)))
 
+        above = aliased(CategoryClosure)
+        below = aliased(CategoryClosure)
+        links = (select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+                 .where(above.descendant_id == parent_id, below.ancestor_id == category_id))
+        await session.execute(insert(CategoryClosure).from_select(['ancestor_id', 'descendant_id', 'depth'],
+                                                                  links))
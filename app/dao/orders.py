@@ -0,0 +1,122 @@
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import Integer, any_, cast, column, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Order, OrderItem, Product
+from app.backend.dao import BaseDAO, session_scope
+
+
+class OrderDAO(BaseDAO):
+    model = Order
+
+    @classmethod
+    async def reserve(cls, user_id: int, items: dict[int, int], ttl: float,
+                      session: Optional[AsyncSession] = None) -> Optional[int]:
+        """Take stock for every item and create a reserved order, or change nothing and return None."""
+        # Two typed arrays keep one statement (and one prepared plan) for carts of any size.
+        product_ids = cast(sorted(items), ARRAY(Integer))
+        quantities = cast([items[product_id] for product_id in sorted(items)], ARRAY(Integer))
+        cart = (func.unnest(product_ids, quantities)
+                .table_valued(column('product_id', Integer), column('quantity', Integer)).render_derived('cart'))
+        # Lock the rows in id order first so two overlapping carts cannot deadlock each other.
+        locked = (select(Product.id).where(Product.id == any_(product_ids)).order_by(Product.id).with_for_update()
+                  .cte('locked').prefix_with('MATERIALIZED'))
+        reserved = (update(Product)
+                    .where(Product.id == locked.c.id, Product.id == cart.c.product_id, Product.is_active,
+                           Product.stock >= cart.c.quantity)
+                    .values(stock=Product.stock - cart.c.quantity)
+                    .returning(Product.id.label('product_id'), cart.c.quantity,
+                               func.coalesce(Product.price, 0).label('price'), Product.stock)
+                    .cte('reserved'))
+        new_order = insert(Order).from_select(
+            ['user_id', 'status', 'total', 'expires_at'],
+            select(literal(user_id), literal('reserved'), func.sum(reserved.c.price * reserved.c.quantity),
+                   func.now() + timedelta(seconds=ttl))
+            .having(func.count() == len(items))
+        ).returning(Order.id).cte('new_order')
+        new_items = insert(OrderItem).from_select(
+            ['order_id', 'product_id', 'quantity', 'price'],
+            select(new_order.c.id, reserved.c.product_id, reserved.c.quantity, reserved.c.price)
+        ).returning(OrderItem.id).cte('new_items')
+
+        emptied = select(func.bool_or(reserved.c.stock < 1)).scalar_subquery()
+
+        async with session_scope(session) as scoped:
+            row = (await scoped.execute(select(new_order.c.id, emptied).add_cte(new_items))).one_or_none()
+            if row is None:
+                # Some item was short. The decrements that did match are undone with the transaction, which a
+                # caller passing its own session must roll back itself (get_db does when the route raises).
+                if session is None:
+                    await scoped.rollback()
+                return None
+            order_id, sold_out = row
+            cls._stock_changed(scoped, sorted(items), sold_out)
+            if session is None:
+                await scoped.commit()
+            return order_id
+
+    @classmethod
+    def _stock_changed(cls, session: AsyncSession, product_ids: list[int], availability_changed: bool):
+        # A new count only touches the cached reads holding these products. A product selling out or coming back
+        # also changes in-stock listings it is not on yet and the facet counts, which only a table flush covers.
+        if availability_changed:
+            cls._invalidate(session, 'orders', 'products')
+        else:
+            cls._invalidate(session, 'orders')
+            cls._invalidate_rows(session, product_ids, table='products')
+
+    @classmethod
+    async def confirm(cls, order_id: int, user_id: int, session: Optional[AsyncSession] = None) -> bool:
+        async with session_scope(session, commit=True) as scoped:
+            query = (update(Order)
+                     .where(Order.id == order_id, Order.user_id == user_id, Order.status == 'reserved',
+                            Order.expires_at > func.now())
+                     .values(status='paid').returning(Order.id))
+            confirmed = (await scoped.execute(query)).scalar_one_or_none() is not None
+            cls._invalidate(scoped, 'orders')
+            return confirmed
+
+    @classmethod
+    async def release(cls, filters: list[bool], status: str, limit: Optional[int] = None, skip_locked: bool = False,
+                      session: Optional[AsyncSession] = None) -> int:
+        """Move matching reserved orders to `status` and put their stock back; returns how many were released."""
+        claimed = (select(Order.id).where(Order.status == 'reserved', *filters).order_by(Order.expires_at)
+                   .limit(limit).with_for_update(skip_locked=skip_locked).cte('claimed'))
+        released = (update(Order).where(Order.id == claimed.c.id).values(status=status)
+                    .returning(Order.id).cte('released'))
+        returned = (select(OrderItem.product_id, func.sum(OrderItem.quantity).label('quantity'))
+                    .join(released, OrderItem.order_id == released.c.id)
+                    .group_by(OrderItem.product_id).cte('returned'))
+        restocked = (update(Product).where(Product.id == returned.c.product_id)
+                     .values(stock=Product.stock + returned.c.quantity)
+                     .returning(Product.id, (Product.stock - returned.c.quantity < 1).label('back_in_stock'))
+                     .cte('restocked'))
+        query = select(select(func.count()).select_from(released).scalar_subquery(),
+                       select(func.array_agg(restocked.c.id)).scalar_subquery(),
+                       select(func.bool_or(restocked.c.back_in_stock)).scalar_subquery())
+
+        async with session_scope(session, commit=True) as scoped:
+            count, product_ids, back_in_stock = (await scoped.execute(query)).one()
+            if count:
+                cls._stock_changed(scoped, product_ids or [], bool(back_in_stock))
+            return count
+
+    @classmethod
+    async def cancel(cls, order_id: int, user_id: int, session: Optional[AsyncSession] = None) -> bool:
+        return await cls.release([Order.id == order_id, Order.user_id == user_id], 'cancelled',
+                                 session=session) > 0
+
+    @classmethod
+    async def expire(cls, limit: int, session: Optional[AsyncSession] = None) -> int:
+        # SKIP LOCKED lets several workers sweep side by side, and never waits on a checkout paying for its order.
+        return await cls.release([Order.expires_at <= func.now()], 'expired', limit=limit, skip_locked=True,
+                                 session=session)
+
+    @classmethod
+    async def items(cls, order_ids: list[int], session: Optional[AsyncSession] = None) -> list:
+        query = (select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.price)
+                 .where(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.order_id, OrderItem.id))
+        return await cls._fetch(query, lambda result: result.all(), session)
@@ -1,7 +1,147 @@
+from typing import Optional
+
+from sqlalchemy import Float, String, func, literal, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
 from app.models import Product
+from app.schemas import SProductRead
+from app.backend.cache import TTLCache
 from app.backend.dao import BaseDAO
+from app.backend.pagination import keyset, make_page
+
+# Inlined literal: a bound parameter would stop generic plans from matching the partial indexes.
+in_stock = Product.stock > literal_column('0')
+
+
+class ProductQuery:
+    # Inlined defaults for the same reason as in_stock: they must match the expression indexes on every plan.
+    sorts = {
+        'price': (func.coalesce(Product.price, literal_column('0')), False),
+        '-price': (func.coalesce(Product.price, literal_column('0')), True),
+        'rating': (func.coalesce(Product.rating, literal_column('0.0')), True),
+        'newest': (Product.id, True),
+    }
+
+    def __init__(self):
+        self.filters = [Product.is_active]
+        self.order_by, self.descending = Product.id, False
+        self.params = {}
+
+    @property
+    def key(self) -> tuple:
+        return tuple(sorted(self.params.items()))
+
+    def only_in_stock(self, enabled: bool = True) -> 'ProductQuery':
+        if enabled:
+            self.filters.append(in_stock)
+            self.params['in_stock'] = True
+        return self
+
+    def price_between(self, min_price: Optional[int] = None, max_price: Optional[int] = None) -> 'ProductQuery':
+        if min_price is not None:
+            self.filters.append(Product.price >= min_price)
+            self.params['min_price'] = min_price
+        if max_price is not None:
+            self.filters.append(Product.price <= max_price)
+            self.params['max_price'] = max_price
+        return self
+
+    def min_rating(self, rating: Optional[float]) -> 'ProductQuery':
+        if rating is not None:
+            self.filters.append(Product.rating >= rating)
+            self.params['min_rating'] = rating
+        return self
+
+    def supplier(self, supplier_id: Optional[int]) -> 'ProductQuery':
+        if supplier_id is not None:
+            self.filters.append(Product.supplier_id == supplier_id)
+            self.params['supplier_id'] = supplier_id
+        return self
+
+    def categories(self, category_ids: Optional[list[int]]) -> 'ProductQuery':
+        if category_ids is not None:
+            self.filters.append(Product.category_id.in_(category_ids))
+            self.params['category_ids'] = tuple(category_ids)
+        return self
+
+    def sort(self, name: Optional[str]) -> 'ProductQuery':
+        if name is not None:
+            self.order_by, self.descending = self.sorts[name]
+            self.params['sort'] = name
+        return self
 
 
 class ProductDAO(BaseDAO):
     model = Product
+    cache = TTLCache('products', ttl=60, maxsize=10000, tables=('products',))
+    available = (Product.is_active, in_stock)
+    read_columns = BaseDAO.columns_for(SProductRead, Product)
+
+    @classmethod
+    async def import_many(cls, rows: list[dict], session: Optional[AsyncSession] = None) -> list[int]:
+        return await cls.upsert_many(rows, index_elements=('slug',),
+                                     update_columns=('name', 'description', 'price', 'image_url', 'stock',
+                                                     'category_id', 'is_active'),
+                                     session=session)
+
+    @classmethod
+    async def _sorted_page(cls, filters: list, order_by, descending: bool, limit: int, after: Optional[str],
+                           session: Optional[AsyncSession]) -> dict:
+        query = select(*cls.read_columns, order_by.label('sort_key'), cls.last_modified()).where(*filters)
+        query = keyset(query, order_by, Product.id, limit, after, descending)
+        rows = await cls._fetch(query, lambda result: result.all(), session)
+        if order_by is Product.id:
+            return make_page(rows, limit, lambda row: (row.id,))
+        return make_page(rows, limit, lambda row: (row.sort_key, row.id))
+
+    @classmethod
+    async def find_filtered(cls, query: ProductQuery, limit: int, after: Optional[str] = None,
+                            session: Optional[AsyncSession] = None) -> dict:
+        return await cls._sorted_page(query.filters, query.order_by, query.descending, limit, after, session)
+
+    @classmethod
+    async def facets(cls, query: ProductQuery, session: Optional[AsyncSession] = None) -> dict:
+        bounds = settings.PRICE_FACET_BOUNDS
+        price_bucket = func.width_bucket(Product.price, array(bounds))
+        rating_bucket = func.floor(func.coalesce(Product.rating, 0.0))
+        # One scan with GROUPING SETS instead of a COUNT per facet; grouping() tells the sets apart.
+        statement = (select(func.grouping(Product.category_id, price_bucket, rating_bucket),
+                            Product.category_id, price_bucket, rating_bucket, func.count())
+                     .where(*query.filters)
+                     .group_by(func.grouping_sets(tuple_(Product.category_id), tuple_(price_bucket),
+                                                  tuple_(rating_bucket))))
+        rows = await cls._fetch(statement, lambda result: result.all(), session)
+
+        facets = {'categories': [], 'price': [], 'rating': []}
+        for grouping, category_id, price, rating, count in rows:
+            if grouping == 0b011:
+                facets['categories'].append({'category_id': category_id, 'count': count})
+            elif grouping == 0b101 and price is not None:
+                facets['price'].append({'min': bounds[price - 1] if price > 0 else None,
+                                        'max': bounds[price] if price < len(bounds) else None,
+                                        'count': count})
+            elif grouping == 0b110:
+                facets['rating'].append({'rating': int(rating), 'count': count})
+        for values, field in ((facets['categories'], 'category_id'), (facets['rating'], 'rating')):
+            values.sort(key=lambda value: (value[field] is None, value[field]))
+        facets['price'].sort(key=lambda value: (value['min'] is not None, value['min'] or 0))
+        return facets
 
+    @classmethod
+    async def search(cls, text: str, limit: int, after: Optional[str] = None,
+                     category_ids: Optional[list[int]] = None, min_price: Optional[int] = None,
+                     max_price: Optional[int] = None, in_stock: bool = True,
+                     session: Optional[AsyncSession] = None) -> dict:
+        ts_query = func.websearch_to_tsquery('simple', text)
+        # Word similarity scores the query against the best-matching run of words in the name; plain similarity
+        # compares it with the whole name and misses a misspelled word in any name longer than one word.
+        rank = (func.ts_rank_cd(Product.search_vector, ts_query, type_=Float)
+                + func.word_similarity(text, Product.name, type_=Float))
+        query = ProductQuery().only_in_stock(in_stock).categories(category_ids).price_between(min_price, max_price)
+        # Either side of the OR can use its own GIN index, so typos still match through trigrams.
+        filters = [or_(Product.search_vector.bool_op('@@')(ts_query),
+                       literal(text, String).bool_op('<%')(Product.name)),
+                   *query.filters]
+        return await cls._sorted_page(filters, rank, True, limit, after, session)
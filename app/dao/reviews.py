@@ -1,42 +1,112 @@
-from app.models import Rating, Review
-from app.backend.dao import BaseDAO
-from app.backend.db import async_session_maker
+from app.models import Product, Rating, Review
+from app.schemas import SRatingRead, SReviewRead
+from app.backend.dao import BaseDAO, session_scope
+from app.backend.pagination import keyset, make_page
+from typing import Optional
 
-from sqlalchemy import select, insert, update
+from sqlalchemy import Float, Integer, any_, case, cast, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class ReviewDAO(BaseDAO):
     model = Review
+    review_columns = BaseDAO.columns_for(SReviewRead, Review)
+    rating_columns = [column.label(f'ratings_{column.key}') for column in BaseDAO.columns_for(SRatingRead, Rating)]
+
+    @staticmethod
+    def _unpack_rows(rows) -> list[dict]:
+        return [{'review': {name: row[name] for name in SReviewRead.model_fields},
+                 'rating': {name: row[f'ratings_{name}'] for name in SRatingRead.model_fields}}
+                for row in rows]
+
+    @classmethod
+    def _unpack(cls, result):
+        return cls._unpack_rows(result.mappings().all())
 
     @classmethod
-    async def find_all(cls, filters: list[bool] = [], **filter_by):
-        async with async_session_maker() as session:
-            query = select(cls.model, Rating).join(Rating).where(*filters).filter_by(**filter_by)
-            result = await session.execute(query)
-            return [{'review': review, 'rating': rating} for review, rating in result.all()]
+    def _with_rating(cls, filters: list[bool], filter_by: dict):
+        return (select(*cls.review_columns, *cls.rating_columns).join_from(cls.model, Rating)
+                .where(*filters).filter_by(**filter_by))
+
+    @classmethod
+    async def find_all(cls, filters: list[bool] = [], session: Optional[AsyncSession] = None, **filter_by):
+        return await cls._fetch(cls._with_rating(filters, filter_by), cls._unpack, session)
+
+    @classmethod
+    async def find_page(cls, limit: int, after: Optional[str] = None, filters: list[bool] = [],
+                        session: Optional[AsyncSession] = None, **filter_by):
+        query = keyset(cls._with_rating(filters, filter_by), None, cls.model.id, limit, after)
+        rows = await cls._fetch(query, cls._unpack, session)
+        return make_page(rows, limit, lambda row: (row['review']['id'],))
+
+    @classmethod
+    async def summaries(cls, product_ids: list[int], limit: int, session: Optional[AsyncSession] = None) -> dict:
+        """The `limit` newest active reviews of each product plus its review count and average grade."""
+        partition = {'partition_by': cls.model.product_id}
+        ranked = (select(*cls.review_columns, *cls.rating_columns,
+                         func.row_number().over(**partition, order_by=cls.model.id.desc()).label('position'),
+                         func.count().over(**partition).label('review_count'),
+                         func.avg(Rating.grade).over(**partition).label('average_grade'))
+                  .join_from(cls.model, Rating)
+                  .where(cls.model.is_active, Rating.is_active,
+                         cls.model.product_id == any_(cast(product_ids, ARRAY(Integer))))
+                  .subquery())
+        query = (select(ranked).where(ranked.c.position <= limit)
+                 .order_by(ranked.c.product_id, ranked.c.position))
+
+        def unpack(result):
+            rows = result.mappings().all()
+            summaries = {product_id: {'product_id': product_id, 'review_count': 0, 'average_grade': None,
+                                      'reviews': []} for product_id in product_ids}
+            for row, review in zip(rows, cls._unpack_rows(rows)):
+                summary = summaries[row['product_id']]
+                summary['review_count'] = row['review_count']
+                summary['average_grade'] = float(row['average_grade'])
+                summary['reviews'].append(review)
+            return summaries
+
+        return await cls._fetch(query, unpack, session)
 
     @classmethod
-    async def add(cls, **data):
-        async with async_session_maker() as session:
-            rating_add_query = insert(Rating).values(user_id=data['user_id'],
-                                                     product_id=data['product_id'],
-                                                     grade=data['grade']).returning(Rating.id)
-            rating_id = (await session.execute(rating_add_query)).scalar()
-            review_add_query = insert(cls.model).values(
-                user_id=data['user_id'],
-                product_id=data['product_id'],
-                rating_id=rating_id,
-                comment=data['comment'],
-                comment_date=data['comment_date']
-            )
-            await session.execute(review_add_query)
-            await session.commit()
+    async def add(cls, session: Optional[AsyncSession] = None, **data):
+        async with session_scope(session, commit=True) as session:
+            new_rating = insert(Rating).values(user_id=data['user_id'],
+                                               product_id=data['product_id'],
+                                               grade=data['grade'],
+                                               is_active=True).returning(Rating.id, Rating.product_id,
+                                                                         Rating.grade).cte('new_rating')
+            new_review = insert(cls.model).from_select(
+                ['user_id', 'product_id', 'rating_id', 'comment', 'comment_date', 'is_active'],
+                select(literal(data['user_id']),
+                       new_rating.c.product_id,
+                       new_rating.c.id,
+                       literal(data['comment'], cls.model.comment.type),
+                       literal(data['comment_date'], cls.model.comment_date.type),
+                       literal(True))
+            ).returning(cls.model.id).cte('new_review')
+            product_update_query = update(Product).where(Product.id == new_rating.c.product_id).values(
+                rating_sum=Product.rating_sum + new_rating.c.grade,
+                rating_count=Product.rating_count + 1,
+                rating=cast(Product.rating_sum + new_rating.c.grade, Float) / cast(Product.rating_count + 1, Float)
+            ).add_cte(new_review)
+            await session.execute(product_update_query)
+            cls._invalidate(session, 'reviews', 'ratings', 'products')
 
     @classmethod
-    async def delete(cls, review_id, rating_id):
-        async with async_session_maker() as session:
-            review_update_query = update(cls.model).where(cls.id == review_id).values(is_active=False)
-            await session.execute(review_update_query)
-            rating_update_query = update(Rating).where(Rating.id == rating_id).values(is_active=False)
-            await session.execute(rating_update_query)
-            await session.commit()
+    async def delete(cls, review_id, rating_id, session: Optional[AsyncSession] = None):
+        async with session_scope(session, commit=True) as session:
+            old_review = update(cls.model).where(cls.model.id == review_id).values(
+                is_active=False).returning(cls.model.id).cte('old_review')
+            old_rating = update(Rating).where(Rating.id == rating_id, Rating.is_active).values(
+                is_active=False).returning(Rating.product_id, Rating.grade).cte('old_rating')
+            remaining = Product.rating_count - 1
+            product_update_query = update(Product).where(Product.id == old_rating.c.product_id).values(
+                rating_sum=Product.rating_sum - old_rating.c.grade,
+                rating_count=remaining,
+                rating=case((remaining > 0,
+                             cast(Product.rating_sum - old_rating.c.grade, Float) / cast(remaining, Float)),
+                            else_=0.0)
+            ).add_cte(old_review)
+            await session.execute(product_update_query)
+            cls._invalidate(session, 'reviews', 'ratings', 'products')
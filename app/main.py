@@ -1,16 +1,60 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from app.routers import category, products, auth, permissions, reviews, pages
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.backend.assets import PrecompressedStaticFiles
+from app.backend.compression import CompressionMiddleware
+from app.backend.invalidation import bus
+from app.backend.metrics import MetricsMiddleware, render_metrics
+from app.backend.ratelimit import AdmissionMiddleware, limiter
+from app.backend.replicas import ReplicaRoutingMiddleware, replicas
+from app.config import settings
+from app.routers import category, products, auth, permissions, reviews, pages, orders
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await bus.start()
+    await limiter.start()
+    sweeper = asyncio.create_task(orders.sweep_reservations())
+    yield
+    sweeper.cancel()
+    await limiter.stop()
+    await bus.stop()
+    await replicas.dispose()
 
-app = FastAPI()
-app_v1 = FastAPI(title='Store API')
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app_v1 = FastAPI(title='Store API', default_response_class=ORJSONResponse)
+if replicas.replicas:
+    app.add_middleware(ReplicaRoutingMiddleware,
+                       cookie=settings.READ_YOUR_WRITES_COOKIE,
+                       window=settings.READ_YOUR_WRITES_WINDOW)
+app.add_middleware(CompressionMiddleware,
+                   minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+                   gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+                   brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+                   exclude_paths=settings.COMPRESSION_EXCLUDE_PATHS)
+app.add_middleware(AdmissionMiddleware,
+                   budgets=settings.RATE_LIMITS,
+                   rate_limiter=limiter,
+                   max_pool_wait=settings.ADMISSION_MAX_POOL_WAIT,
+                   exclude_paths=settings.ADMISSION_EXCLUDE_PATHS)
+# Outermost, so the latency it records includes compression. app_v1 is mounted under app and is covered too.
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 async def welcome() -> dict:
     return {"message": "My e-commerce app"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
+
 app.mount('/v1', app_v1)
-app_v1.mount('/static', StaticFiles(directory='app/static'), name='static')
+app_v1.mount('/static', PrecompressedStaticFiles(directory='app/static'), name='static')
 
 app_v1.include_router(pages.router)
 app_v1.include_router(auth.router)
@@ -18,5 +62,6 @@ app_v1.include_router(category.router)
 app_v1.include_router(products.router)
 app_v1.include_router(permissions.router)
 app_v1.include_router(reviews.router)
+app_v1.include_router(orders.router)
 
 
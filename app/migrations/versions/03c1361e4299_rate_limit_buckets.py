@@ -0,0 +1,33 @@
+"""Rate limit buckets
+
+Revision ID: 03c1361e4299
+Revises: 9c249b3c1a19
+Create Date: 2026-10-18 18:12:05.771342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '03c1361e4299'
+down_revision: Union[str, None] = '9c249b3c1a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Used by RATE_LIMIT_BACKEND=postgres only. Not in WAL: buckets are worthless after a crash anyway.
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    prefixes=['UNLOGGED']
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_buckets')
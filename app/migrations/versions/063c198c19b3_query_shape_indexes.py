@@ -0,0 +1,41 @@
+"""Query shape indexes
+
+Revision ID: 063c198c19b3
+Revises: 3c3f1e0cffc6
+Create Date: 2026-10-18 12:20:51.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '063c198c19b3'
+down_revision: Union[str, None] = '3c3f1e0cffc6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_available', 'products', ['id'], unique=False,
+                        postgresql_where=sa.text('is_active AND stock > 0'), postgresql_concurrently=True)
+        op.create_index('ix_products_available_category', 'products', ['category_id', 'id'], unique=False,
+                        postgresql_where=sa.text('is_active AND stock > 0'), postgresql_concurrently=True)
+        op.create_index('ix_reviews_active_product', 'reviews', ['product_id', 'id'], unique=False,
+                        postgresql_where=sa.text('is_active'), postgresql_concurrently=True)
+        op.create_index('ix_ratings_product_active', 'ratings', ['product_id', 'is_active'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_categories_parent_id'), 'categories', ['parent_id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_categories_parent_id'), table_name='categories', postgresql_concurrently=True)
+        op.drop_index('ix_ratings_product_active', table_name='ratings', postgresql_concurrently=True)
+        op.drop_index('ix_reviews_active_product', table_name='reviews', postgresql_concurrently=True)
+        op.drop_index('ix_products_available_category', table_name='products', postgresql_concurrently=True)
+        op.drop_index('ix_products_available', table_name='products', postgresql_concurrently=True)
@@ -0,0 +1,33 @@
+"""updated_at indexes
+
+Revision ID: 47e2ff5f2bdd
+Revises: 3be5702c0daf
+Create Date: 2026-10-18 21:05:12.640217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '47e2ff5f2bdd'
+down_revision: Union[str, None] = '3be5702c0daf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lets the max(updated_at) behind list pages' Last-Modified read one index entry.
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_products_updated_at'), 'products', ['updated_at'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_categories_updated_at'), 'categories', ['updated_at'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_categories_updated_at'), table_name='categories', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_products_updated_at'), table_name='products', postgresql_concurrently=True)
@@ -0,0 +1,43 @@
+"""Product rating aggregates
+
+Revision ID: 4c741e649305
+Revises: 628f94054cc0
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c741e649305'
+down_revision: Union[str, None] = '628f94054cc0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('products', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE products
+        SET rating_sum = totals.rating_sum,
+            rating_count = totals.rating_count,
+            rating = totals.rating_sum::float / totals.rating_count
+        FROM (
+            SELECT product_id, sum(grade) AS rating_sum, count(*) AS rating_count
+            FROM ratings
+            WHERE is_active
+            GROUP BY product_id
+        ) AS totals
+        WHERE products.id = totals.product_id
+    """)
+    # Products without active ratings still carry a rating from the old running formula.
+    op.execute('UPDATE products SET rating = 0 WHERE rating_count = 0')
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'rating_count')
+    op.drop_column('products', 'rating_sum')
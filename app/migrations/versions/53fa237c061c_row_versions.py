@@ -0,0 +1,56 @@
+"""Row versions
+
+Revision ID: 53fa237c061c
+Revises: 08bfbea41b58
+Create Date: 2026-10-18 15:11:42.604913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '53fa237c061c'
+down_revision: Union[str, None] = '08bfbea41b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('products', 'categories'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True),
+                                       server_default=sa.text('now()'), nullable=False))
+    op.add_column('products', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.execute("""
+        CREATE FUNCTION bump_row_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := OLD.version + 1;
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION touch_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute('CREATE TRIGGER products_bump_row_version BEFORE UPDATE ON products '
+               'FOR EACH ROW EXECUTE FUNCTION bump_row_version()')
+    op.execute('CREATE TRIGGER categories_touch_updated_at BEFORE UPDATE ON categories '
+               'FOR EACH ROW EXECUTE FUNCTION touch_updated_at()')
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER categories_touch_updated_at ON categories')
+    op.execute('DROP TRIGGER products_bump_row_version ON products')
+    op.execute('DROP FUNCTION touch_updated_at()')
+    op.execute('DROP FUNCTION bump_row_version()')
+    op.drop_column('products', 'version')
+    for table in ('categories', 'products'):
+        op.drop_column(table, 'updated_at')
@@ -1,6 +1,7 @@
-from .category import Category
+from .category import Category, CategoryClosure
 from .products import Product
 from .user import User
 from .reviews import Review
 from .ratings import Rating
 
+from .orders import Order, OrderItem
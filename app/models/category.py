@@ -1,5 +1,5 @@
 from app.backend.db import Base
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, func
 from sqlalchemy.orm import relationship
 
 
@@ -10,7 +10,16 @@ class Category(Base):
     name = Column(String)
     slug = Column(String, unique=True, index=True)
     is_active = Column(Boolean, default=True)
-    parent_id = Column(Integer, ForeignKey('categories.id'), nullable=True)
+    parent_id = Column(Integer, ForeignKey('categories.id'), nullable=True, index=True)
+    # Set by the touch_updated_at trigger on every UPDATE.
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
 
     products = relationship('Product', back_populates='category')
 
+
+class CategoryClosure(Base):
+    __tablename__ = 'category_closure'
+
+    ancestor_id = Column(Integer, ForeignKey('categories.id'), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey('categories.id'), primary_key=True, index=True)
+    depth = Column(Integer, nullable=False)
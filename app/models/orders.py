@@ -0,0 +1,33 @@
+from app.backend.db import Base
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Index, func, text
+from sqlalchemy.orm import relationship
+
+
+class Order(Base):
+    __tablename__ = 'orders'
+    __table_args__ = (
+        Index('ix_orders_user', 'user_id', 'id'),
+        # Only live reservations are ever swept, so the index stays as small as the backlog of them.
+        Index('ix_orders_reserved_expires_at', 'expires_at', postgresql_where=text("status = 'reserved'")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    status = Column(String, nullable=False, server_default='reserved')
+    total = Column(Integer, nullable=False, server_default='0')
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    items = relationship('OrderItem', back_populates='order')
+
+
+class OrderItem(Base):
+    __tablename__ = 'order_items'
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Integer, nullable=False)
+
+    order = relationship('Order', back_populates='items')
@@ -1,10 +1,22 @@
 from app.backend.db import Base
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, DateTime, ForeignKey, Integer, String, Boolean, Float, Index, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 
 class Product(Base):
     __tablename__ = 'products'
+    __table_args__ = (
+        Index('ix_products_available', 'id', postgresql_where=text('is_active AND stock > 0')),
+        Index('ix_products_available_category', 'category_id', 'id',
+              postgresql_where=text('is_active AND stock > 0')),
+        Index('ix_products_available_price', text('coalesce(price, 0)'), 'id',
+              postgresql_where=text('is_active AND stock > 0')),
+        Index('ix_products_available_rating', text('coalesce(rating, 0.0)'), 'id',
+              postgresql_where=text('is_active AND stock > 0')),
+        Index('ix_products_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_products_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
@@ -16,7 +28,15 @@ class Product(Base):
     supplier_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     category_id = Column(Integer, ForeignKey('categories.id'))
     rating = Column(Float)
+    rating_sum = Column(Integer, nullable=False, default=0, server_default='0')
+    rating_count = Column(Integer, nullable=False, default=0, server_default='0')
     is_active = Column(Boolean, default=True)
+    # Both are bumped by the bump_row_version trigger on every UPDATE.
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    version = Column(Integer, nullable=False, server_default='1')
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')", persisted=True)))
 
     category = relationship('Category', back_populates='products')
 
@@ -1,10 +1,13 @@
 from app.backend.db import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 
 
 class Rating(Base):
     __tablename__ = 'ratings'
+    __table_args__ = (
+        Index('ix_ratings_product_active', 'product_id', 'is_active'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
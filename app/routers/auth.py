@@ -8,14 +8,12 @@ from app.dao import UserDAO
 
 from typing import Annotated
 
-from passlib.context import CryptContext
-
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from app.config import settings
+from jose import JWTError
+from app.backend.passwords import password_hasher
+from app.backend.tokens import decode_token, encode_token
 
 router = APIRouter(prefix='/auth', tags=['auth'])
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
@@ -26,7 +24,7 @@ async def authenticate_user(username: str, password: str):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    if not bcrypt_context.verify(password, user.hashed_password) or user.is_active == False:
+    if not await password_hasher.verify(password, user.hashed_password) or user.is_active == False:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
@@ -41,7 +39,7 @@ async def create_user(created_user: SUser):
                       last_name=created_user.last_name,
                       username=created_user.username,
                       email=created_user.email,
-                      hashed_password=bcrypt_context.hash(created_user.password))
+                      hashed_password=await password_hasher.hash(created_user.password))
     return {
         'status_code': status.HTTP_201_CREATED,
         'transaction': 'Successful'
@@ -64,12 +62,12 @@ async def create_access_token(username: str, user_id: int, is_admin: bool, is_su
                               expires_delta: timedelta):
     to_encode = {'sub': username, 'id': user_id, 'is_admin': is_admin, 'is_supplier': is_supplier,
                  'is_customer': is_customer, 'exp': datetime.now() + expires_delta}
-    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    return encode_token(to_encode)
 
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_token(token)
         if (username := payload.get('sub')) is None or (user_id := payload.get('id')) is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,28 +1,51 @@
-from fastapi import APIRouter, Depends, status, HTTPException
-from typing import Annotated, List
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request
+from typing import Annotated, Optional
 
 from app.models import *
-from app.schemas import SCategory
+from app.schemas import SCategory, SCategoryRead, SPage
 from app.routers.auth import get_current_user
 from app.dao import CategoryDAO
+from app.backend.db_depends import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.backend.cache import TTLCache
+from app.backend.conditional import is_not_modified, make_etag, page_last_modified, validator_headers
+from app.backend.responses import render_json
+from fastapi.responses import Response
 
 from slugify import slugify
 
 router = APIRouter(prefix='/category', tags=['category'])
+responses_cache = TTLCache('category_responses', ttl=60, maxsize=256, tables=('categories',))
 
 
-@router.get('/all_categories', response_model=list[SCategory])
-async def get_all_categories():
-    return await CategoryDAO.find_all(filters=[Category.is_active])
+@router.get('/all_categories', response_model=SPage[SCategoryRead])
+async def get_all_categories(request: Request,
+                             limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = settings.DEFAULT_PAGE_SIZE,
+                             after: Optional[str] = None):
+    async def render():
+        page = await CategoryDAO.find_page(limit, after, filters=[Category.is_active],
+                                           columns=[*CategoryDAO.columns_for(SCategoryRead),
+                                                    CategoryDAO.last_modified()])
+        return render_json(SPage[SCategoryRead], page), page_last_modified(page)
+
+    body, last_modified = await responses_cache.get_or_load((limit, after), render)
+    etag = make_etag('categories', body)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
 
 
 @router.post('/create', status_code=status.HTTP_201_CREATED)
 async def create_category(created_category: SCategory,
-                          user: Annotated[dict, Depends(get_current_user)]):
+                          user: Annotated[dict, Depends(get_current_user)],
+                          db: Annotated[AsyncSession, Depends(get_db)]):
     if not user.get('is_admin'):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
-    await CategoryDAO.add(name=created_category.name,
+    await CategoryDAO.add(session=db,
+                          name=created_category.name,
                           parent_id=created_category.parent_id,
                           slug=slugify(created_category.name))
     return {
@@ -34,21 +57,27 @@ async def create_category(created_category: SCategory,
 @router.put('/update_category')
 async def update_category(category_id: int,
                           updated_category: SCategory,
-                          user: Annotated[dict, Depends(get_current_user)]):
+                          user: Annotated[dict, Depends(get_current_user)],
+                          db: Annotated[AsyncSession, Depends(get_db)]):
     if not user.get('is_admin'):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
-    category = await CategoryDAO.find_by_id(category_id)
+    category = await CategoryDAO.find_by_id(category_id, session=db)
     if category is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='There is no category found'
         )
-
-    await CategoryDAO.update(filters=[Category.id == category_id],
-                             name=updated_category.name,
-                             slug=slugify(updated_category.name),
-                             parent_id=updated_category.parent_id)
+    moved = await CategoryDAO.update(filters=[Category.id == category_id],
+                                     session=db,
+                                     name=updated_category.name,
+                                     slug=slugify(updated_category.name),
+                                     parent_id=updated_category.parent_id)
+    if not moved:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail='Category cannot be moved under itself'
+        )
 
     return {
         'status_code': status.HTTP_200_OK,
@@ -58,17 +87,18 @@ async def update_category(category_id: int,
 
 @router.delete('/delete')
 async def delete_category(category_id: int,
-                          user: Annotated[dict, Depends(get_current_user)]):
+                          user: Annotated[dict, Depends(get_current_user)],
+                          db: Annotated[AsyncSession, Depends(get_db)]):
     if not user.get('is_admin'):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
-    category = await CategoryDAO.find_by_id(category_id)
+    category = await CategoryDAO.find_by_id(category_id, session=db)
     if category is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='There is no category found'
         )
-    await CategoryDAO.update(filters=[category_id == Category.id], is_active=False)
+    await CategoryDAO.update(filters=[category_id == Category.id], session=db, is_active=False)
     return {
         'status_code': status.HTTP_200_OK,
         'transaction': 'Category delete is successful'
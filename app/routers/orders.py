@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Annotated, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Order
+from app.schemas import SOrder, SOrderRead, SPage
+from app.routers.auth import get_current_user
+from app.dao import OrderDAO
+from app.backend.db_depends import get_db
+from app.config import settings
+
+router = APIRouter(prefix='/orders', tags=['orders'])
+logger = logging.getLogger(__name__)
+order_columns = [Order.id, Order.user_id, Order.status, Order.total, Order.created_at, Order.expires_at]
+
+
+@router.post('/', status_code=status.HTTP_201_CREATED)
+async def reserve_order(order: SOrder,
+                        user: Annotated[dict, Depends(get_current_user)],
+                        db: Annotated[AsyncSession, Depends(get_db)]):
+    items = {}
+    for item in order.items:
+        items[item.product_id] = items.get(item.product_id, 0) + item.quantity
+    if len(items) > settings.ORDER_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f'At most {settings.ORDER_MAX_ITEMS} products per order')
+
+    order_id = await OrderDAO.reserve(user.get('id'), items, settings.ORDER_RESERVATION_TTL, session=db)
+    if order_id is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail='Some products are unavailable or out of stock')
+    return {
+        'status_code': status.HTTP_201_CREATED,
+        'transaction': 'Successful',
+        'order_id': order_id
+    }
+
+
+@router.get('/', response_model=SPage[SOrderRead])
+async def my_orders(user: Annotated[dict, Depends(get_current_user)],
+                    limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = settings.DEFAULT_PAGE_SIZE,
+                    after: Optional[str] = None):
+    page = await OrderDAO.find_page(limit, after, descending=True, filters=[Order.user_id == user.get('id')],
+                                    columns=order_columns)
+    order_ids = [order.id for order in page['items']]
+    items = {}
+    for item in await OrderDAO.items(order_ids) if order_ids else []:
+        items.setdefault(item.order_id, []).append(item)
+    page['items'] = [{**order._mapping, 'items': items.get(order.id, [])} for order in page['items']]
+    return page
+
+
+@router.post('/{order_id}/confirm')
+async def confirm_order(order_id: int,
+                        user: Annotated[dict, Depends(get_current_user)],
+                        db: Annotated[AsyncSession, Depends(get_db)]):
+    if not await OrderDAO.confirm(order_id, user.get('id'), session=db):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail='Order is not reserved or its reservation has expired')
+    return {
+        'status_code': status.HTTP_200_OK,
+        'transaction': 'Order is paid'
+    }
+
+
+@router.delete('/{order_id}')
+async def cancel_order(order_id: int,
+                       user: Annotated[dict, Depends(get_current_user)],
+                       db: Annotated[AsyncSession, Depends(get_db)]):
+    if not await OrderDAO.cancel(order_id, user.get('id'), session=db):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='No reserved order found')
+    return {
+        'status_code': status.HTTP_200_OK,
+        'transaction': 'Order is cancelled'
+    }
+
+
+async def sweep_reservations():
+    while True:
+        try:
+            while await OrderDAO.expire(settings.ORDER_SWEEP_BATCH) == settings.ORDER_SWEEP_BATCH:
+                pass
+        except Exception:
+            logger.exception('Expiring order reservations failed')
+        await asyncio.sleep(settings.ORDER_SWEEP_INTERVAL)
@@ -1,17 +1,67 @@
+import os
+from typing import AsyncIterator, Iterable, Iterator
+
 from fastapi import APIRouter, Request
-from fastapi.params import Depends
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from typing import Annotated
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+from starlette.concurrency import iterate_in_threadpool
 
-from app.routers.category import get_all_categories, update_category
+from app.models import Category
+from app.dao import CategoryDAO
+from app.backend.assets import asset_url
+from app.backend.cache import MISSING, TTLCache
+from app.config import settings
 
 router = APIRouter(prefix="/pages", tags=["pages"])
 
-templates = Jinja2Templates(directory="app/templates")
+bytecode_cache = None
+if settings.TEMPLATE_BYTECODE_CACHE_DIR:
+    os.makedirs(settings.TEMPLATE_BYTECODE_CACHE_DIR, exist_ok=True)
+    bytecode_cache = FileSystemBytecodeCache(settings.TEMPLATE_BYTECODE_CACHE_DIR)
+templates = Jinja2Templates(env=Environment(loader=FileSystemLoader("app/templates"), autoescape=True,
+                                            bytecode_cache=bytecode_cache))
+templates.env.globals['asset'] = asset_url
+pages_cache = TTLCache('pages', ttl=settings.PAGES_CACHE_TTL, maxsize=64, tables=('categories',))
+
+
+def buffered(chunks: Iterable[str], size: int) -> Iterator[str]:
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+async def stream_and_cache(template: Template, context: dict, key, generation: int) -> AsyncIterator[str]:
+    rendered = []
+    async for chunk in iterate_in_threadpool(buffered(template.generate(context), settings.PAGES_STREAM_CHUNK_SIZE)):
+        rendered.append(chunk)
+        yield chunk
+    if settings.CACHE_ENABLED and generation == pages_cache.generation:
+        pages_cache.set(key, ''.join(rendered))
+
 
 @router.get("/categories", response_class=HTMLResponse)
-async def get_categories_pages(request: Request,
-                               categories: Annotated[dict, Depends(get_all_categories)]):
-    return templates.TemplateResponse("categories.html", {"request": request,
-                                                          "categories": categories})
\ No newline at end of file
+async def get_categories_pages(request: Request):
+    # Rendered URLs depend on the host the page was requested through.
+    key = ('categories', str(request.base_url))
+    page = pages_cache.get(key) if settings.CACHE_ENABLED else MISSING
+    if page is not MISSING:
+        return HTMLResponse(page)
+
+    generation = pages_cache.generation
+    categories = await CategoryDAO.find_all(filters=[Category.is_active])
+    template = templates.get_template("categories.html")
+    context = {"request": request, "categories": categories}
+    if len(categories) >= settings.PAGES_STREAM_MIN_ITEMS:
+        return StreamingResponse(stream_and_cache(template, context, key, generation), media_type='text/html')
+
+    page = template.render(context)
+    if settings.CACHE_ENABLED and generation == pages_cache.generation:
+        pages_cache.set(key, page)
+    return HTMLResponse(page)
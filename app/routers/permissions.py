@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Annotated, Optional
 from app.models import User
 from app.routers.auth import get_current_user
 from app.dao import UserDAO
+from app.backend.db_depends import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
 
 router = APIRouter(prefix='/permission', tags=['permission'])
 
 
 @router.get('/temp')
-async def get_users():
-    users = await UserDAO.find_all()  # db.scalars(select(User))
+async def get_users(limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = settings.DEFAULT_PAGE_SIZE,
+                    after: Optional[str] = None):
+    users = await UserDAO.find_page(limit, after)  # db.scalars(select(User))
     return users
 
 
@@ -24,32 +28,34 @@ async def update_user():
 
 @router.patch('/')
 async def supplier_permission(admin: Annotated[dict, Depends(get_current_user)],
-                              user_id: int):
+                              user_id: int,
+                              db: Annotated[AsyncSession, Depends(get_db)]):
     if not admin.get('is_admin'):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
-    user = await UserDAO.find_by_id(user_id)  # db.scalar(select(User).where(User.id == user_id))
+    user = await UserDAO.find_by_id(user_id, session=db)  # db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail='User not found')
-    await UserDAO.update(filters=[User.id == user_id], is_supplier=not user.is_supplier)
+    await UserDAO.update(filters=[User.id == user_id], session=db, is_supplier=not user.is_supplier)
     return {"status_code": status.HTTP_200_OK,
             "message": "User is now supplier" if user.is_supplier else "User is no longer supplier"}
 
 
 @router.delete('/delete')
 async def delete_user(admin: Annotated[dict, Depends(get_current_user)],
-                      user_id: int):
+                      user_id: int,
+                      db: Annotated[AsyncSession, Depends(get_db)]):
     if not admin.get('is_admin'):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
-    user = await UserDAO.find_by_id(user_id)
+    user = await UserDAO.find_by_id(user_id, session=db)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail='User not found')
     if user.is_admin:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail='You cannot delete Admin')
-    await UserDAO.update(filters=[User.id == user_id], is_active=not user.is_active)
+    await UserDAO.update(filters=[User.id == user_id], session=db, is_active=not user.is_active)
     return {"status_code": status.HTTP_200_OK,
             "message": "User is activated" if user.is_active else "User is deleted"}
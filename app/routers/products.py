@@ -1,78 +1,255 @@
-from fastapi import APIRouter
-from typing import Annotated
-from app.schemas import SProduct
+import asyncio
+
+from fastapi import APIRouter, Query, Request, UploadFile
+from typing import Annotated, Literal, Optional
+from pydantic import ValidationError
+from app.schemas import SPage, SProduct, SProductPage, SProductRead
 from fastapi import status, Depends, HTTPException
-from app.models import Product
+from app.models import Category, Product
 from app.routers.auth import get_current_user
-from app.dao import ProductDAO, CategoryDAO
+from app.dao import ProductDAO, ProductQuery, CategoryDAO
+from app.backend.db_depends import get_db
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.backend.cache import TTLCache
+from app.backend.conditional import is_not_modified, make_etag, page_last_modified, validator_headers
+from app.backend.responses import render_json
+from app.backend.streaming import encode_csv, encode_ndjson, read_batches
+from fastapi.responses import Response, StreamingResponse
 from slugify import slugify
 
 router = APIRouter(prefix='/products', tags=['products'])
+responses_cache = TTLCache('product_responses', ttl=30, maxsize=1024, tables=('products', 'categories'))
+
+
+def product_query(min_price: Annotated[Optional[int], Query(ge=0)] = None,
+                  max_price: Annotated[Optional[int], Query(ge=0)] = None,
+                  min_rating: Annotated[Optional[float], Query(ge=0, le=5)] = None,
+                  supplier_id: Optional[int] = None,
+                  in_stock: bool = True,
+                  sort: Optional[Literal['price', '-price', 'rating', 'newest']] = None) -> ProductQuery:
+    return (ProductQuery().price_between(min_price, max_price).min_rating(min_rating).supplier(supplier_id)
+            .only_in_stock(in_stock).sort(sort))
+
+
+async def product_page(query: ProductQuery, limit: int, after: Optional[str], facets: bool) -> dict:
+    if not facets:
+        return await ProductDAO.find_filtered(query, limit, after)
+    products, counts = await asyncio.gather(ProductDAO.find_filtered(query, limit, after),
+                                            ProductDAO.facets(query))
+    return {**products, 'facets': counts}
 
 
-@router.get('/')
-async def all_products():
-    products = await ProductDAO.find_all(filters=[Product.stock > 0,
-                                                  Product.is_active])
-    if products:
-        return products
+@router.get('/', response_model=SProductPage)
+async def all_products(query: Annotated[ProductQuery, Depends(product_query)],
+                       limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = settings.DEFAULT_PAGE_SIZE,
+                       after: Optional[str] = None,
+                       facets: bool = False):
+    async def render():
+        products = await product_page(query, limit, after, facets)
+        return render_json(SProductPage, products) if products['items'] else None
+
+    body = await responses_cache.get_or_load(('all', query.key, limit, after, facets), render)
+    if body is not None:
+        return Response(content=body, media_type='application/json')
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Products not found")
 
 
+def product_row(product: SProduct, supplier_id: Optional[int]) -> dict:
+    return {
+        'name': product.name,
+        'slug': slugify(product.name),
+        'description': product.description,
+        'price': product.price,
+        'image_url': product.image_url,
+        'stock': product.stock,
+        'category_id': product.category_id,
+        'supplier_id': supplier_id,
+        'rating': 0.0,
+        'is_active': True,
+    }
+
+
 @router.post('/create', status_code=status.HTTP_201_CREATED)
 async def create_product(
         created_product: Annotated[Product, Depends(SProduct)],
-        user: Annotated[dict, Depends(get_current_user)]):
+        user: Annotated[dict, Depends(get_current_user)],
+        db: Annotated[AsyncSession, Depends(get_db)]):
     if not user.get('is_admin') or not user.get('is_supplier'):
         raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
                             detail='You must have admin or supplier role to use this method')
-    await ProductDAO.add(
-        name=created_product.name,
-        slug=slugify(created_product.name),
-        description=created_product.description,
-        price=created_product.price,
-        image_url=created_product.image_url,
-        stock=created_product.stock,
-        category_id=created_product.category_id,
-        supplier_id=user.get('id'),
-        rating=0.0,
-        is_active=True
-    )
+    await ProductDAO.add(session=db, **product_row(created_product, user.get('id')))
     return {
         'status_code': status.HTTP_201_CREATED,
         'transaction': 'Successful'
     }
 
 
-@router.get('/{category_slug}')
-async def product_by_category(category_slug: str):
-    category = await CategoryDAO.find_one_or_none(
-        slug=category_slug)
-    if category is None:
+@router.post('/bulk_import', status_code=status.HTTP_201_CREATED)
+async def bulk_import_products(products: list[SProduct],
+                               user: Annotated[dict, Depends(get_current_user)],
+                               db: Annotated[AsyncSession, Depends(get_db)]):
+    if not user.get('is_admin'):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    if len(products) > settings.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f'At most {settings.BULK_IMPORT_MAX_ROWS} products per request')
+
+    ids = await ProductDAO.import_many([product_row(product, user.get('id')) for product in products], session=db)
+    return {
+        'status_code': status.HTTP_201_CREATED,
+        'transaction': 'Successful',
+        'count': len(ids)
+    }
+
+
+@router.get('/export')
+async def export_products(user: Annotated[dict, Depends(get_current_user)],
+                          format: Literal['ndjson', 'csv'] = 'ndjson'):
+    if not user.get('is_admin'):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+    partitions = ProductDAO.stream(batch_size=settings.EXPORT_BATCH_SIZE)
+    if format == 'csv':
+        return StreamingResponse(encode_csv(partitions, SProductRead), media_type='text/csv',
+                                 headers={'Content-Disposition': 'attachment; filename="products.csv"'})
+    return StreamingResponse(encode_ndjson(partitions, SProductRead), media_type='application/x-ndjson',
+                             headers={'Content-Disposition': 'attachment; filename="products.ndjson"'})
+
+
+@router.post('/import')
+async def import_products(file: UploadFile,
+                          user: Annotated[dict, Depends(get_current_user)],
+                          format: Optional[Literal['ndjson', 'csv']] = None):
+    if not user.get('is_admin'):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    if format is None:
+        format = 'csv' if (file.filename or '').endswith('.csv') else 'ndjson'
+
+    imported, failed, errors = 0, 0, []
+
+    def reject(line: int, detail):
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            errors.append({'line': line, 'errors': detail})
+
+    async for batch in read_batches(file.file, format, settings.IMPORT_BATCH_SIZE):
+        rows, lines, first_lines = [], [], {}
+        for line, data in batch:
+            try:
+                if isinstance(data, Exception):
+                    raise ValueError(str(data))
+                row = product_row(SProduct.model_validate(data), user.get('id'))
+            except (ValidationError, ValueError) as exc:
+                reject(line, exc.errors(include_url=False, include_input=False) if isinstance(exc, ValidationError)
+                       else str(exc))
+                continue
+            # upsert_many keeps only the last row per slug in one statement, so a repeat would be counted but never
+            # stored. Across slices a repeat is an ordinary update of the row imported before; checking those too
+            # would mean holding every slug of the upload in memory.
+            if row['slug'] in first_lines:
+                reject(line, f"Duplicate slug '{row['slug']}', first seen on line {first_lines[row['slug']]}")
+                continue
+            first_lines[row['slug']] = line
+            rows.append(row)
+            lines.append(line)
+
+        if not rows:
+            continue
+        known = {category.id for category in await CategoryDAO.find_all(
+            filters=[Category.id.in_({row['category_id'] for row in rows})], columns=[Category.id])}
+        valid = []
+        for line, row in zip(lines, rows):
+            if row['category_id'] in known:
+                valid.append((line, row))
+            else:
+                reject(line, f"Unknown category_id {row['category_id']}")
+        if not valid:
+            continue
+        try:
+            imported += len(await ProductDAO.import_many([row for _, row in valid]))
+        except (IntegrityError, DataError) as exc:
+            # Earlier slices are already committed; report this one as failed and carry on.
+            for line, _ in valid:
+                reject(line, str(exc.orig))
+
+    return {
+        'status_code': status.HTTP_200_OK,
+        'imported': imported,
+        'failed': failed,
+        'errors': errors
+    }
+
+
+@router.get('/search', response_model=SPage[SProductRead])
+async def search_products(q: Annotated[str, Query(min_length=1, max_length=200)],
+                          category: Optional[str] = None,
+                          min_price: Annotated[Optional[int], Query(ge=0)] = None,
+                          max_price: Annotated[Optional[int], Query(ge=0)] = None,
+                          in_stock: bool = True,
+                          limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = settings.DEFAULT_PAGE_SIZE,
+                          after: Optional[str] = None):
+    category_ids = None
+    if category is not None:
+        category_ids = await CategoryDAO.descendant_ids(slug=category)
+        if category_ids is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
+    return await ProductDAO.search(q, limit, after, category_ids=category_ids, min_price=min_price,
+                                   max_price=max_price, in_stock=in_stock)
+
+
+@router.get('/{category_slug}', response_model=SProductPage)
+async def product_by_category(category_slug: str,
+                              query: Annotated[ProductQuery, Depends(product_query)],
+                              request: Request,
+                              limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = settings.DEFAULT_PAGE_SIZE,
+                              after: Optional[str] = None,
+                              facets: bool = False):
+    category_ids = await CategoryDAO.descendant_ids(slug=category_slug)
+    if category_ids is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
-    subcategories = await CategoryDAO.find_all(parent_id=category.id)
-    subcategories = list([subcategory.id for subcategory in subcategories])
-    products = await ProductDAO.find_all(filters=[
-        Product.category_id.in_([category.id] + subcategories),
-        Product.stock > 0, Product.is_active])
-    if products:
-        return products
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Products not found")
+    query.categories(category_ids)
+
+    async def render():
+        products = await product_page(query, limit, after, facets)
+        if not products['items']:
+            return None
+        return render_json(SProductPage, products), page_last_modified(products)
 
+    page = await responses_cache.get_or_load(('category', query.key, limit, after, facets), render)
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Products not found")
+    body, last_modified = page
+    # Tagged by the page itself: a stamp over the whole subtree would cost more than the page on every poll.
+    etag = make_etag('products', body)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
 
-@router.get('/detail/{product_slug}')
-async def product_detail(product_slug: str):
+
+@router.get('/detail/{product_slug}', response_model=SProductRead)
+async def product_detail(product_slug: str, request: Request, response: Response):
     product = await ProductDAO.find_one_or_none(slug=product_slug)
     if product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+
+    etag = make_etag('product', product_slug, product.version, product.updated_at)
+    if is_not_modified(request, etag, product.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers=validator_headers(etag, product.updated_at))
+    response.headers.update(validator_headers(etag, product.updated_at))
     return product
 
 
 @router.put('/detail/{product_slug}')
 async def update_product(product_slug: str,
                          updated_product: Annotated[Product, Depends(SProduct)],
-                         user: Annotated[dict, Depends(get_current_user)]):
-    product = await ProductDAO.find_one_or_none(slug=product_slug)
+                         user: Annotated[dict, Depends(get_current_user)],
+                         db: Annotated[AsyncSession, Depends(get_db)]):
+    product = await ProductDAO.find_one_or_none(slug=product_slug, session=db)
     if product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
 
@@ -80,6 +257,7 @@ async def update_product(product_slug: str,
         raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
                             detail='You must be admin or supplier to use this method')
     await ProductDAO.update(filters=[product.id == Product.id],
+                            session=db,
                             name=updated_product.name,
                             description=updated_product.description,
                             price=updated_product.price,
@@ -95,8 +273,9 @@ async def update_product(product_slug: str,
 
 @router.delete('/delete')
 async def delete_product(product_slug: str,
-                         user: Annotated[dict, Depends(get_current_user)]):
-    product = await ProductDAO.find_one_or_none(slug=product_slug)
+                         user: Annotated[dict, Depends(get_current_user)],
+                         db: Annotated[AsyncSession, Depends(get_db)]):
+    product = await ProductDAO.find_one_or_none(slug=product_slug, session=db)
     if product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
 
@@ -104,6 +283,7 @@ async def delete_product(product_slug: str,
         raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
                             detail='You must be admin or supplier to use this method')
     await ProductDAO.update(filters=[product.id == Product.id],
+                            session=db,
                             is_active=False
                             )
     return {
@@ -1,38 +1,62 @@
 import datetime
 
-from fastapi import APIRouter, Depends, status, HTTPException
-from app.models import Review, Rating, Product
-from app.schemas import SReview
+from fastapi import APIRouter, Depends, status, HTTPException, Query
+from app.models import Review, Rating
+from app.schemas import SPage, SReview, SReviewSummary, SReviewWithRating
 from app.routers.auth import get_current_user
-from app.dao import ReviewDAO, ProductDAO
+from app.dao import ReviewDAO
+from app.backend.db_depends import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.backend.loader import BatchLoader
 
-from typing import Annotated
+from typing import Annotated, Optional
 
 router = APIRouter(prefix='/preview', tags=['reviews'])
+summary_loaders: dict[int, BatchLoader] = {}
 
 
-@router.get('/all_reviews')
-async def get_all_reviews():
-    return await ReviewDAO.find_all(filters=[Review.is_active, Rating.is_active])
+def summary_loader(limit: int) -> BatchLoader:
+    loader = summary_loaders.get(limit)
+    if loader is None:
+        loader = summary_loaders[limit] = BatchLoader(lambda product_ids: ReviewDAO.summaries(product_ids, limit),
+                                                      max_batch_size=settings.REVIEW_SUMMARY_MAX_PRODUCTS,
+                                                      delay=settings.REVIEW_LOADER_DELAY)
+    return loader
 
 
-@router.get('/products_reviews')
-async def get_product_reviews(product_id: int):
-    return await ReviewDAO.find_all(filters=[Review.is_active, Rating.is_active], product_id=product_id)
+@router.get('/all_reviews', response_model=SPage[SReviewWithRating])
+async def get_all_reviews(limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = settings.DEFAULT_PAGE_SIZE,
+                          after: Optional[str] = None):
+    return await ReviewDAO.find_page(limit, after, filters=[Review.is_active, Rating.is_active])
+
+
+@router.get('/products_reviews', response_model=SPage[SReviewWithRating])
+async def get_product_reviews(product_id: int,
+                              limit: Annotated[int, Query(ge=1, le=settings.MAX_PAGE_SIZE)] = settings.DEFAULT_PAGE_SIZE,
+                              after: Optional[str] = None):
+    return await ReviewDAO.find_page(limit, after, filters=[Review.is_active, Rating.is_active,
+                                                            Review.product_id == product_id])
+
+
+@router.get('/summaries', response_model=list[SReviewSummary])
+async def get_review_summaries(
+        product_ids: Annotated[list[int], Query(min_length=1, max_length=settings.REVIEW_SUMMARY_MAX_PRODUCTS)],
+        limit: Annotated[int, Query(ge=1, le=settings.REVIEW_SUMMARY_MAX_REVIEWS)] = 3):
+    return await summary_loader(limit).load_many(dict.fromkeys(product_ids))
 
 
 @router.post('/add_review')
 async def post_review(review: Annotated[SReview, Depends()],
-                      user: Annotated[dict, Depends(get_current_user)]):
-    await ReviewDAO.add(user_id=user.get('id'),
+                      user: Annotated[dict, Depends(get_current_user)],
+                      db: Annotated[AsyncSession, Depends(get_db)]):
+    await ReviewDAO.add(session=db,
+                        user_id=user.get('id'),
                         product_id=review.product_id,
                         grade=review.grade,
                         comment=review.comment,
                         comment_date=datetime.datetime.now(),
                         )
-    review_count = len(tuple(await get_product_reviews(review.product_id)))
-    await ProductDAO.update(filters=[Product.id == review.product_id],
-                            rating=(Product.rating + review.grade) / review_count)
     return {
         "status_code": status.HTTP_200_OK,
         "message": "Review is created"
@@ -41,15 +65,16 @@ async def post_review(review: Annotated[SReview, Depends()],
 
 @router.delete('/delete_reviews')
 async def delete_review(review_id: int,
-                        user: Annotated[dict, Depends(get_current_user)]):
+                        user: Annotated[dict, Depends(get_current_user)],
+                        db: Annotated[AsyncSession, Depends(get_db)]):
     if not user.get('is_admin'):
         raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
                             detail='You must be admin to perform this action')
     review = await ReviewDAO.find_by_id(review_id, filters=[
-        Review.is_active])
+        Review.is_active], session=db)
     if not review:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail='Review not found')
-    await ReviewDAO.delete(review_id, review.rating_id)
+    await ReviewDAO.delete(review_id, review.rating_id, session=db)
     return {"status_code": status.HTTP_200_OK,
             "message": "Review has been deleted"}
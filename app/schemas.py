@@ -1,4 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Generic, Optional, TypeVar
+from datetime import date, datetime
+
+T = TypeVar('T')
 
 
 class SProduct(BaseModel):
@@ -9,7 +13,22 @@ class SProduct(BaseModel):
     stock: int
     category_id: int
 
-    
+
+class SProductRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str]
+    slug: Optional[str]
+    description: Optional[str]
+    price: Optional[int]
+    image_url: Optional[str]
+    stock: Optional[int]
+    supplier_id: Optional[int]
+    category_id: Optional[int]
+    rating: Optional[float]
+    rating_count: int
+    is_active: Optional[bool]
 
 
 class SCategory(BaseModel):
@@ -17,6 +36,16 @@ class SCategory(BaseModel):
     parent_id: int = Field(default=-1)
 
 
+class SCategoryRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str]
+    slug: Optional[str]
+    parent_id: Optional[int]
+    is_active: Optional[bool]
+
+
 class SUser(BaseModel):
     first_name: str
     last_name: str
@@ -30,3 +59,96 @@ class SReview(BaseModel):
     grade: int
     comment: str
 
+
+class SRatingRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: int
+    product_id: int
+    grade: int
+    is_active: Optional[bool]
+
+
+class SReviewRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: int
+    product_id: int
+    rating_id: int
+    comment: Optional[str]
+    comment_date: Optional[date]
+    is_active: Optional[bool]
+
+
+class SReviewWithRating(BaseModel):
+    review: SReviewRead
+    rating: SRatingRead
+
+
+class SReviewSummary(BaseModel):
+    product_id: int
+    review_count: int
+    average_grade: Optional[float]
+    reviews: list[SReviewWithRating]
+
+
+class SPage(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = None
+
+
+class SCategoryFacet(BaseModel):
+    category_id: Optional[int]
+    count: int
+
+
+class SPriceFacet(BaseModel):
+    min: Optional[int]
+    max: Optional[int]
+    count: int
+
+
+class SRatingFacet(BaseModel):
+    rating: int
+    count: int
+
+
+class SProductFacets(BaseModel):
+    categories: list[SCategoryFacet]
+    price: list[SPriceFacet]
+    rating: list[SRatingFacet]
+
+
+class SProductPage(SPage[SProductRead]):
+    facets: Optional[SProductFacets] = None
+
+
+class SOrderItem(BaseModel):
+    product_id: int
+    quantity: int = Field(gt=0)
+
+
+class SOrder(BaseModel):
+    items: list[SOrderItem] = Field(min_length=1)
+
+
+class SOrderItemRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    product_id: int
+    quantity: int
+    price: int
+
+
+class SOrderRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: int
+    status: str
+    total: int
+    created_at: datetime
+    expires_at: datetime
+    items: list[SOrderItemRead] = []
@@ -0,0 +1,52 @@
+"""Per-request cost of token verification, before and after the token cache.
+
+    python -m bench.auth_overhead [--iterations N]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from jose import jwt
+
+from app.backend.tokens import token_cache
+from app.config import settings
+from app.routers.auth import create_access_token, get_current_user
+
+
+async def legacy_get_current_user(token: str) -> dict:
+    payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    if datetime.now() > datetime.fromtimestamp(payload['exp']):
+        raise RuntimeError('Token expired!')
+    return {'username': payload.get('sub'),
+            'id': payload.get('id'),
+            'is_admin': payload.get('is_admin'),
+            'is_supplier': payload.get('is_supplier'),
+            'is_customer': payload.get('is_customer')}
+
+
+async def measure(func, token: str, iterations: int, cold: bool = False) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if cold:
+            token_cache.clear()
+        await func(token)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int):
+    token = await create_access_token('bench', 1, False, False, True, expires_delta=timedelta(minutes=20))
+    await get_current_user(token)
+    results = {
+        'legacy jose.decode': await measure(legacy_get_current_user, token, iterations),
+        'pre-parsed key, cache miss': await measure(get_current_user, token, iterations, cold=True),
+        'pre-parsed key, cache hit': await measure(get_current_user, token, iterations),
+    }
+    for name, micros in results.items():
+        print(f'{name:<30} {micros:8.2f} us/request')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=20000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,79 @@
+"""Run EXPLAIN on every hot DAO query shape and fail if any of them needs a sequential scan.
+
+Point the usual DB_* settings at a migrated local database and run
+
+    python -m bench.explain_queries
+
+Sequential scans are disabled for the EXPLAIN session, so a Seq Scan node in a plan means
+no index can serve that shape at all, regardless of how much data the database holds.
+"""
+import asyncio
+import json
+import sys
+
+from app.backend.db import engine
+from app.backend.pagination import encode_cursor
+from app.backend.query_log import capture_queries
+from app.config import settings
+from app.dao import CategoryDAO, ProductDAO, ProductQuery, ReviewDAO, UserDAO
+from app.models import Product, Rating, Review
+
+SHAPES = {
+    'products: available page': lambda: ProductDAO.find_page(50, filters=[*ProductDAO.available]),
+    'products: available deep page': lambda: ProductDAO.find_page(50, encode_cursor(10 ** 6),
+                                                                  filters=[*ProductDAO.available]),
+    'products: by categories': lambda: ProductDAO.find_page(50, filters=[Product.category_id.in_([1, 2, 3]),
+                                                                         *ProductDAO.available]),
+    'products: by slug': lambda: ProductDAO.find_one_or_none(slug='bench'),
+    'products: listing': lambda: ProductDAO.find_filtered(ProductQuery().only_in_stock(), 50),
+    'products: listing by price': lambda: ProductDAO.find_filtered(ProductQuery().only_in_stock().sort('price'), 50),
+    'products: listing by -price': lambda: ProductDAO.find_filtered(ProductQuery().only_in_stock().sort('-price'),
+                                                                    50),
+    'products: listing by rating': lambda: ProductDAO.find_filtered(ProductQuery().only_in_stock().sort('rating'),
+                                                                    50),
+    'products: listing in categories': lambda: ProductDAO.find_filtered(
+        ProductQuery().only_in_stock().categories([1, 2, 3]), 50),
+    'products: facets': lambda: ProductDAO.facets(ProductQuery().only_in_stock()),
+    'products: search': lambda: ProductDAO.search('wodden chair', 50),
+    'categories: by slug': lambda: CategoryDAO.find_one_or_none(slug='bench'),
+    'categories: children': lambda: CategoryDAO.find_all(parent_id=1),
+    'reviews: by product': lambda: ReviewDAO.find_page(50, filters=[Review.is_active, Rating.is_active,
+                                                                    Review.product_id == 1]),
+    'reviews: by id': lambda: ReviewDAO.find_by_id(1),
+    'reviews: summaries': lambda: ReviewDAO.summaries(list(range(1, 51)), settings.REVIEW_SUMMARY_MAX_REVIEWS),
+    'users: by username': lambda: UserDAO.find_one_or_none(username='bench'),
+}
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = [plan.get('Relation Name', '?')] if plan['Node Type'] == 'Seq Scan' else []
+    for child in plan.get('Plans', []):
+        found += seq_scans(child)
+    return found
+
+
+async def explain(statement: str, parameters) -> dict:
+    async with engine.connect() as connection:
+        await connection.exec_driver_sql('SET enable_seqscan = off')
+        result = await connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+        plan = result.scalar_one()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+
+async def main() -> int:
+    settings.CACHE_ENABLED = False
+    failures = 0
+    for name, run in SHAPES.items():
+        with capture_queries() as statements:
+            await run()
+        for statement, parameters in statements:
+            tables = seq_scans(await explain(statement, parameters))
+            status = f'SEQ SCAN on {", ".join(tables)}' if tables else 'ok'
+            failures += bool(tables)
+            print(f'{name:<36} {status}')
+    await engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,70 @@
+"""Measure checkout throughput when every buyer wants the same product.
+
+Point the usual DB_* settings at a migrated, seeded local database and run
+
+    python -m bench.flash_sale [--product-id 1] [--stock 2000] [--concurrency 64] [--quantity 1]
+
+The product's stock is set to --stock and --concurrency buyers reserve --quantity units each, in a loop, until
+the product sells out. The script reports reservations per second and latency percentiles, and checks that
+stock was never oversold. Afterwards the orders it created are cancelled and the original stock is restored.
+Exits 1 if the stock and the reserved quantities disagree.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.backend.db import engine
+from app.dao import OrderDAO, ProductDAO
+from app.models import Order, Product
+
+USER_ID = 1
+
+
+async def buyer(product_id: int, quantity: int, order_ids: list[int], latencies: list[float]):
+    while True:
+        started = time.perf_counter()
+        order_id = await OrderDAO.reserve(USER_ID, {product_id: quantity}, ttl=600)
+        latencies.append(time.perf_counter() - started)
+        if order_id is None:
+            return
+        order_ids.append(order_id)
+
+
+async def main(args: argparse.Namespace) -> int:
+    product = await ProductDAO.find_by_id(args.product_id)
+    if product is None:
+        print(f'product {args.product_id} does not exist, run python -m bench.seed first')
+        return 1
+    original_stock = product.stock
+    await ProductDAO.update(filters=[Product.id == args.product_id], stock=args.stock, is_active=True)
+
+    order_ids, latencies = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(buyer(args.product_id, args.quantity, order_ids, latencies)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    remaining = (await ProductDAO.find_all(filters=[Product.id == args.product_id],
+                                           columns=[Product.stock]))[0].stock
+    sold = len(order_ids) * args.quantity
+    latencies.sort()
+    print(f'{len(order_ids)} reservations in {elapsed:.2f}s: {len(order_ids) / elapsed:.0f}/s, '
+          f'{len(latencies) - len(order_ids)} rejected')
+    for label, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+        print(f'{label} {latencies[int(fraction * (len(latencies) - 1))] * 1000:.2f}ms')
+    print(f'sold {sold} of {args.stock}, {remaining} left')
+
+    await OrderDAO.release([Order.id.in_(order_ids)], 'cancelled')
+    await ProductDAO.update(filters=[Product.id == args.product_id], stock=original_stock)
+    await engine.dispose()
+    return 0 if sold + remaining == args.stock and remaining < args.quantity else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--product-id', type=int, default=1)
+    parser.add_argument('--stock', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--quantity', type=int, default=1)
+    sys.exit(asyncio.run(main(parser.parse_args())))
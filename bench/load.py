@@ -0,0 +1,220 @@
+"""Drive every v1 route with concurrent HTTP load and record a latency baseline.
+
+Seed a local database with `python -m bench.seed`, start the app with rate limiting off (for example
+`RATE_LIMIT_BACKEND=none uvicorn app.main:app --workers 1`) and run
+
+    python -m bench.load --base-url http://127.0.0.1:8000 --output bench/baseline.json
+    python -m bench.load --compare bench/baseline.json
+
+Endpoints are loaded one at a time, each for --duration seconds with --concurrency open requests, and the
+report gives p50/p95/p99 latency, throughput, errors and SQL statements per request. Query counts are the
+change in db_query_duration_seconds_count on /metrics around each run, so they are only meaningful against a
+single worker process that nothing else is using. Writes mutate the seeded data and only run with --writes;
+the product export streams the whole catalog and only runs with --export.
+
+With --compare, an endpoint whose p95 latency grew or whose throughput dropped by more than --threshold
+(a fraction), or that issues more statements per request than before, is reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from typing import Callable, Optional
+
+import httpx
+
+USER = 'bench_admin'
+PASSWORD = 'bench'
+
+
+def substitute(value, n: int):
+    # Writes number their payloads so unique columns (usernames, slugs) do not collide.
+    if isinstance(value, str):
+        return value.replace('{n}', str(n))
+    if isinstance(value, dict):
+        return {key: substitute(item, n) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(substitute(item, n) for item in value)
+    return value
+
+
+def request(method: str, path: str, **kwargs) -> Callable[[int], dict]:
+    def build(n: int) -> dict:
+        return {'method': method, 'url': substitute(path, n), **substitute(kwargs, n)}
+    return build
+
+
+READS = {
+    'products': request('GET', '/v1/products/'),
+    'products_facets': request('GET', '/v1/products/?facets=true&sort=price'),
+    'products_search': request('GET', '/v1/products/search?q=wooden+chair'),
+    'products_search_typo': request('GET', '/v1/products/search?q=wodden'),
+    'products_by_category': request('GET', '/v1/products/bench'),
+    'product_detail': request('GET', '/v1/products/detail/bench'),
+    'categories': request('GET', '/v1/category/all_categories'),
+    'all_reviews': request('GET', '/v1/preview/all_reviews'),
+    'product_reviews': request('GET', '/v1/preview/products_reviews?product_id=1'),
+    'review_summaries': request('GET', '/v1/preview/summaries?'
+                                       + '&'.join(f'product_ids={n}' for n in range(1, 51))),
+    'users': request('GET', '/v1/permission/temp'),
+    'current_user': request('GET', '/v1/auth/read_current_user'),
+    'my_orders': request('GET', '/v1/orders/'),
+    'categories_page': request('GET', '/v1/pages/categories'),
+    'static': request('GET', '/v1/static/images/not found.webp'),
+}
+WRITES = {
+    'create_user': request('POST', '/v1/auth/', json={'first_name': 'Load', 'last_name': 'Test',
+                                                       'username': 'load_{n}', 'email': 'load_{n}@example.com',
+                                                       'password': PASSWORD}),
+    'login': request('POST', '/v1/auth/token', data={'username': USER, 'password': PASSWORD}),
+    'create_category': request('POST', '/v1/category/create', json={'name': 'Load category {n}', 'parent_id': 1}),
+    'update_category': request('PUT', '/v1/category/update_category?category_id=2',
+                               json={'name': 'Load category', 'parent_id': 1}),
+    'delete_category': request('DELETE', '/v1/category/delete?category_id=2'),
+    'create_product': request('POST', '/v1/products/create?name=Load+product+{n}&description=Load&price=100'
+                                      '&image_url=x&stock=10&category_id=2'),
+    'bulk_import': request('POST', '/v1/products/bulk_import',
+                           json=[{'name': 'Load import {n}', 'description': 'Load', 'price': 100, 'image_url': 'x',
+                                  'stock': 10, 'category_id': 2}]),
+    'import': request('POST', '/v1/products/import?format=ndjson',
+                      files={'file': ('load.ndjson', '{"name": "Load file {n}", "description": "Load", "price": 100, '
+                                                     '"image_url": "x", "stock": 10, "category_id": 2}\n')}),
+    'update_product': request('PUT', '/v1/products/detail/bench-product-2?name=Load+product&description=Load'
+                                     '&price=100&image_url=x&stock=10&category_id=2'),
+    'delete_product': request('DELETE', '/v1/products/delete?product_slug=bench-product-3'),
+    'add_review': request('POST', '/v1/preview/add_review?product_id=1&grade=5&comment=Load+{n}'),
+    'delete_review': request('DELETE', '/v1/preview/delete_reviews?review_id={n}'),
+    'update_user': request('PUT', '/v1/permission/update'),
+    'toggle_supplier': request('PATCH', '/v1/permission/?user_id=2'),
+    'delete_user': request('DELETE', '/v1/permission/delete?user_id=3'),
+    'reserve_order': request('POST', '/v1/orders/', json={'items': [{'product_id': 4, 'quantity': 1},
+                                                                    {'product_id': 5, 'quantity': 1}]}),
+    'cancel_order': request('DELETE', '/v1/orders/{n}'),
+}
+EXPORT = {
+    'export': request('GET', '/v1/products/export'),
+}
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def query_count(client: httpx.AsyncClient) -> Optional[float]:
+    response = await client.get('/metrics')
+    if response.status_code != 200:
+        return None
+    return sum(float(line.rsplit(' ', 1)[1]) for line in response.text.splitlines()
+               if line.startswith('db_query_duration_seconds_count'))
+
+
+async def run_endpoint(client: httpx.AsyncClient, build: Callable[[int], dict], duration: float,
+                       concurrency: int) -> dict:
+    counter = itertools.count(1)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.request(**build(next(counter)))
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    queries_before = await query_count(client)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    queries_after = await query_count(client)
+
+    latencies.sort()
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries_per_request': None,
+    }
+    if queries_before is not None and queries_after is not None and latencies:
+        result['queries_per_request'] = round((queries_after - queries_before) / len(latencies), 2)
+    return result
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if before['p95_ms'] and now['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f'{name}: p95 {before["p95_ms"]}ms -> {now["p95_ms"]}ms')
+        if before['rps'] and now['rps'] < before['rps'] * (1 - threshold):
+            regressions.append(f'{name}: throughput {before["rps"]}/s -> {now["rps"]}/s')
+        if before['queries_per_request'] is not None and now['queries_per_request'] is not None \
+                and now['queries_per_request'] > before['queries_per_request']:
+            regressions.append(f'{name}: queries per request {before["queries_per_request"]} -> '
+                               f'{now["queries_per_request"]}')
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    scenarios = dict(READS)
+    if args.writes:
+        scenarios.update(WRITES)
+    if args.export:
+        scenarios.update(EXPORT)
+    if args.only:
+        scenarios = {name: build for name, build in scenarios.items() if name in args.only}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        login = await client.post('/v1/auth/token', data={'username': USER, 'password': PASSWORD})
+        login.raise_for_status()
+        client.headers['Authorization'] = f'Bearer {login.json()["access_token"]}'
+
+        results = {}
+        print(f'{"endpoint":<24}{"requests":>10}{"errors":>8}{"rps":>10}{"p50 ms":>10}{"p95 ms":>10}'
+              f'{"p99 ms":>10}{"queries":>9}')
+        for name, build in scenarios.items():
+            result = results[name] = await run_endpoint(client, build, args.duration, args.concurrency)
+            queries = '-' if result['queries_per_request'] is None else result['queries_per_request']
+            print(f'{name:<24}{result["requests"]:>10}{result["errors"]:>8}{result["rps"]:>10}'
+                  f'{result["p50_ms"]:>10}{result["p95_ms"]:>10}{result["p99_ms"]:>10}{queries:>9}')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'duration': args.duration, 'concurrency': args.concurrency, 'endpoints': results}, file,
+                      indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file)['endpoints'], results, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per endpoint')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--writes', action='store_true', help='also run the mutating endpoints')
+    parser.add_argument('--export', action='store_true', help='also run the full catalog export')
+    parser.add_argument('--only', nargs='+', help='endpoint names to run')
+    sys.exit(asyncio.run(main(parser.parse_args())))
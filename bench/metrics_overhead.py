@@ -0,0 +1,103 @@
+"""Cost of the request and SQL instrumentation, measured in-process without a database.
+
+    python -m bench.metrics_overhead [--iterations N] [--request-us US]
+
+Requests go straight into the ASGI apps (no HTTP client), once through a bare app and once through the same app
+wrapped in MetricsMiddleware, so the difference is the middleware alone. SQL events are timed on two in-memory
+SQLite engines, one instrumented. The total is reported against --request-us, the typical catalog request time
+observed in production (bench.load reports it), and the script exits 1 when it exceeds 2%.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from app.backend.metrics import MetricsMiddleware, current_dao, instrument_engine
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    api = FastAPI()
+
+    @api.get('/items/{item_id}')
+    async def item(item_id: int) -> dict:
+        return {'id': item_id, 'name': 'bench'}
+
+    if instrumented:
+        api.add_middleware(MetricsMiddleware)
+    return api
+
+
+async def call(api, path: str):
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+             'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'', 'headers': [],
+             'server': ('bench', 80), 'client': ('127.0.0.1', 1)}
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    await api(scope, receive, send)
+
+
+async def per_request(api, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await call(api, '/items/1')
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def query_runner(instrumented: bool):
+    engine = create_engine('sqlite://')
+    if instrumented:
+        instrument_engine(SimpleNamespace(sync_engine=engine))
+    connection = engine.connect()
+    statement = text('SELECT 1')
+
+    def run(iterations: int) -> float:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            connection.execute(statement).all()
+        return (time.perf_counter() - started) / iterations * 1e6
+
+    run(500)
+    return run
+
+
+def overhead(timings: list[tuple[float, float]]) -> float:
+    # Rounds are interleaved and the fastest of each side is compared, which filters out scheduler noise.
+    return min(instrumented for _, instrumented in timings) - min(bare for bare, _ in timings)
+
+
+async def main(iterations: int, request_us: float, queries: int) -> int:
+    bare, instrumented = build_app(False), build_app(True)
+    await per_request(bare, 500)
+    await per_request(instrumented, 500)
+    request_cost = overhead([(await per_request(bare, iterations), await per_request(instrumented, iterations))
+                             for _ in range(10)])
+
+    current_dao.set('BenchDAO.find_all')
+    plain_queries, instrumented_queries = query_runner(False), query_runner(True)
+    query_cost = overhead([(plain_queries(iterations), instrumented_queries(iterations)) for _ in range(10)])
+
+    total = request_cost + queries * query_cost
+    share = total / request_us * 100
+    print(f'middleware          {request_cost:7.2f} us/request')
+    print(f'sql instrumentation {query_cost:7.2f} us/query')
+    print(f'total               {total:7.2f} us for 1 request + {queries} queries '
+          f'= {share:.2f}% of {request_us:.0f} us')
+    return 1 if share > 2 else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--request-us', type=float, default=2500)
+    parser.add_argument('--queries', type=int, default=2)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.iterations, args.request_us, args.queries)))
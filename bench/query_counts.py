@@ -0,0 +1,52 @@
+"""Check how many SQL statements each read endpoint issues.
+
+Point the usual DB_* settings at a migrated, seeded local database and run
+
+    python -m bench.query_counts
+
+Result caches are disabled so every request reaches the database. Each endpoint is requested once to
+warm process-level state (the category tree), then again under assert_num_queries.
+"""
+import asyncio
+import sys
+
+import httpx
+
+from app.backend.db import engine
+from app.backend.query_log import assert_num_queries
+from app.config import settings
+from app.main import app
+
+ENDPOINTS = {
+    '/v1/products/': 1,
+    '/v1/products/?facets=true&sort=price': 2,
+    '/v1/products/search?q=bench': 1,
+    '/v1/products/bench': 1,
+    '/v1/products/detail/bench': 1,
+    '/v1/category/all_categories': 1,
+    '/v1/preview/all_reviews': 1,
+    '/v1/preview/products_reviews?product_id=1': 1,
+    '/v1/preview/summaries?' + '&'.join(f'product_ids={n}' for n in range(1, 51)): 1,
+    '/v1/pages/categories': 1,
+}
+
+
+async def main() -> int:
+    settings.CACHE_ENABLED = False
+    failures = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        for path, expected in ENDPOINTS.items():
+            await client.get(path)
+            try:
+                with assert_num_queries(expected):
+                    await client.get(path)
+                print(f'{path:<48} ok')
+            except AssertionError as exc:
+                failures += 1
+                print(f'{path:<48} {exc}')
+    await engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,42 @@
+"""Check that product search tolerates misspelled words in multi-word names.
+
+Seed a local database with `python -m bench.seed` (its product names look like "Wooden Chair 42") and run
+
+    python -m bench.search_typos
+
+Each query must return at least one product, and every product on the first page must contain the word the
+query was meant to spell. Exits 1 on the first check that fails.
+"""
+import asyncio
+import sys
+
+from app.backend.db import engine
+from app.config import settings
+from app.dao import ProductDAO
+
+CASES = {
+    'wodden': 'wooden',
+    'kettel': 'kettle',
+    'wodden chairr': 'chair',
+    'wooden chair': 'chair',
+}
+
+
+def check(label: str, passed: bool):
+    print(f'{label:<60} {"ok" if passed else "FAILED"}')
+    if not passed:
+        sys.exit(1)
+
+
+async def main():
+    settings.CACHE_ENABLED = False
+    for text, word in CASES.items():
+        page = await ProductDAO.search(text, 20, in_stock=False)
+        names = [row.name.lower() for row in page['items']]
+        check(f'"{text}" finds products', bool(names))
+        check(f'"{text}" only finds names containing "{word}"', all(word in name for name in names))
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""Fill a migrated local database with synthetic catalog data for benchmarking.
+
+    python -m bench.seed [--users N] [--products N] [--reviews N] [--depth D] [--fanout F]
+
+Everything is generated server side with generate_series, in batches, so 1M products and 10M reviews take
+minutes rather than hours. Existing rows are truncated first. Every fixture the other bench scripts rely on
+is created with a fixed name: the user bench_admin (password "bench"), the category and product slug
+"bench", and product id 1.
+"""
+import argparse
+import asyncio
+import time
+
+import asyncpg
+from passlib.context import CryptContext
+
+from app.config import settings
+
+PASSWORD = 'bench'
+WORDS = ['red', 'blue', 'green', 'black', 'white', 'leather', 'cotton', 'wooden', 'steel', 'classic',
+         'compact', 'wireless', 'portable', 'vintage', 'premium', 'outdoor', 'kitchen', 'office', 'garden', 'travel']
+NOUNS = ['chair', 'table', 'lamp', 'jacket', 'shoes', 'backpack', 'headphones', 'kettle', 'watch', 'mug',
+         'speaker', 'blanket', 'bottle', 'notebook', 'umbrella', 'camera', 'keyboard', 'pillow', 'scarf', 'tent']
+
+
+async def timed(connection: asyncpg.Connection, label: str, statement: str, *args):
+    started = time.perf_counter()
+    await connection.execute(statement, *args)
+    print(f'{label:<40} {time.perf_counter() - started:8.1f}s')
+
+
+def category_rows(depth: int, fanout: int) -> tuple[list[tuple], range]:
+    rows, previous_level, next_id = [], [None], 1
+    for level in range(depth):
+        current_level = []
+        for parent_id in previous_level:
+            for _ in range(fanout if parent_id is not None or level == 0 else 1):
+                slug = 'bench' if next_id == 1 else f'bench-category-{next_id}'
+                rows.append((next_id, f'Category {next_id}', slug, True, parent_id))
+                current_level.append(next_id)
+                next_id += 1
+        previous_level = current_level
+    return rows, range(previous_level[0], previous_level[-1] + 1)
+
+
+async def seed(users: int, products: int, reviews: int, depth: int, fanout: int, batch: int):
+    connection = await asyncpg.connect(settings.database_url.replace('+asyncpg', ''))
+    try:
+        await timed(connection, 'truncate', 'TRUNCATE reviews, ratings, products, category_closure, categories, '
+                                            'users RESTART IDENTITY CASCADE')
+
+        hashed = CryptContext(schemes=['bcrypt'], bcrypt__rounds=settings.BCRYPT_ROUNDS).hash(PASSWORD)
+        await timed(connection, f'users ({users})', """
+            INSERT INTO users (first_name, last_name, username, email, hashed_password,
+                               is_active, is_admin, is_supplier, is_customer)
+            SELECT 'Bench', 'User ' || g, CASE WHEN g = 1 THEN 'bench_admin' ELSE 'bench_user_' || g END,
+                   'bench' || g || '@example.com', $2, true, g = 1, g <= 100, true
+            FROM generate_series(1, $1) AS g
+        """, users, hashed)
+
+        categories, leaves = category_rows(depth, fanout)
+        started = time.perf_counter()
+        await connection.copy_records_to_table('categories', records=categories,
+                                               columns=['id', 'name', 'slug', 'is_active', 'parent_id'])
+        await connection.execute("SELECT setval('categories_id_seq', $1)", len(categories))
+        print(f'{f"categories ({len(categories)})":<40} {time.perf_counter() - started:8.1f}s')
+        await timed(connection, 'category closure', """
+            INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+            WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+                SELECT id, id, 0 FROM categories
+                UNION ALL
+                SELECT tree.ancestor_id, categories.id, tree.depth + 1
+                FROM tree JOIN categories ON categories.parent_id = tree.descendant_id
+            )
+            SELECT ancestor_id, descendant_id, depth FROM tree
+        """)
+
+        for start in range(1, products + 1, batch):
+            stop = min(start + batch - 1, products)
+            await timed(connection, f'products {start}-{stop}', """
+                INSERT INTO products (name, slug, description, price, image_url, stock, supplier_id, category_id,
+                                      rating, rating_sum, rating_count, is_active)
+                SELECT initcap(($4::text[])[1 + g % 20] || ' ' || ($5::text[])[1 + (g / 20) % 20]) || ' ' || g,
+                       CASE WHEN g = 1 THEN 'bench' ELSE 'bench-product-' || g END,
+                       'A ' || ($4::text[])[1 + (g / 7) % 20] || ' ' || ($5::text[])[1 + g % 20]
+                           || ' for everyday use, model ' || g,
+                       (random() * 20000)::int, 'images/not found.webp',
+                       CASE WHEN g % 10 = 0 THEN 0 ELSE 1 + (random() * 500)::int END,
+                       1 + g % least($3, 100), $6 + g % $7, 0, 0, 0, g % 50 <> 0
+                FROM generate_series($1::int, $2::int) AS g
+            """, start, stop, users, WORDS, NOUNS, leaves.start, len(leaves))
+
+        for start in range(1, reviews + 1, batch):
+            stop = min(start + batch - 1, reviews)
+            await timed(connection, f'ratings + reviews {start}-{stop}', """
+                WITH new_ratings AS (
+                    INSERT INTO ratings (id, user_id, product_id, grade, is_active)
+                    SELECT g, 1 + g % $3, 1 + (g::bigint * 7919) % $4, 1 + g % 5, g % 100 <> 0
+                    FROM generate_series($1::int, $2::int) AS g
+                    RETURNING id, user_id, product_id, is_active
+                )
+                INSERT INTO reviews (id, user_id, product_id, rating_id, comment, comment_date, is_active)
+                SELECT id, user_id, product_id, id, 'Bench review ' || id, current_date - (id % 1000), is_active
+                FROM new_ratings
+            """, start, stop, users, products)
+        await connection.execute("SELECT setval('ratings_id_seq', greatest($1, 1))", reviews)
+        await connection.execute("SELECT setval('reviews_id_seq', greatest($1, 1))", reviews)
+
+        await timed(connection, 'product rating aggregates', """
+            UPDATE products SET rating_sum = totals.grade_sum, rating_count = totals.grade_count,
+                                rating = totals.grade_sum::float / totals.grade_count
+            FROM (SELECT product_id, sum(grade) AS grade_sum, count(*) AS grade_count
+                  FROM ratings WHERE is_active GROUP BY product_id) AS totals
+            WHERE products.id = totals.product_id
+        """)
+        await timed(connection, 'vacuum analyze', 'VACUUM ANALYZE')
+    finally:
+        await connection.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--reviews', type=int, default=10000000)
+    parser.add_argument('--depth', type=int, default=6, help='category tree depth')
+    parser.add_argument('--fanout', type=int, default=4, help='children per category below the root')
+    parser.add_argument('--batch', type=int, default=500000)
+    args = parser.parse_args()
+    asyncio.run(seed(args.users, args.products, args.reviews, args.depth, args.fanout, args.batch))